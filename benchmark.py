@@ -0,0 +1,338 @@
+import argparse
+import json
+import math
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import os
+import resource
+import shutil
+import time
+
+import cv2
+
+# --------------------------------------------------
+# Scaling benchmark.
+# Synthesizes increasingly large datasets from the
+# shipped images and records, per size:
+#  - dataset load time and, optionally, offline
+#    index build time and index size
+#  - query latency of both pipelines
+#  - peak RSS after loading and after the queries
+#  - on-disk size of the dataset
+# --------------------------------------------------
+from utils.logger import setup_logger, logger
+from utils.dataset import load_dataset
+from utils.synthetic import synthesize_dataset
+from utils.index_store import index_size
+from index import build_index
+
+from pipelines.object_pipeline import run_object_pipeline
+from pipelines.object_pipeline.features import extract_features
+from pipelines.object_pipeline.masking import text_mask
+from pipelines.logo_pipeline import run_logo_pipeline
+from pipelines.logo_pipeline.edges import extract_edges, edge_orientation_hist
+from pipelines.logo_pipeline.prefilter import (
+    build_orientation_index, orientation_prefilter, prefilter_recall
+)
+
+DATASET_DIR = "data/dataset"
+QUERIES_DIR = "data/queries"
+SYNTHETIC_DIR = "data/synthetic"
+
+
+# Total size in bytes of all files below a directory.
+def disk_usage(root):
+    total = 0
+    for r, _, files in os.walk(root):
+        for f in files:
+            total += os.path.getsize(os.path.join(r, f))
+    return total
+
+
+# Peak resident set size of the current process, in MB.
+# ru_maxrss is reported in KB on Linux.
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+# Measure one dataset size.
+# Runs in a fresh process so that peak RSS reflects only this size.
+def measure_size(dataset_dir, logo_query, object_query, with_index=False):
+    setup_logger()
+
+    index_row = {}
+    if with_index:
+        # Timed from scratch, so any previous index is removed
+        index_dir = dataset_dir + "_index"
+        shutil.rmtree(index_dir, ignore_errors=True)
+        t0 = time.perf_counter()
+        build_index(dataset_dir, index_dir)
+        index_row = {
+            "index_build_s": time.perf_counter() - t0,
+            "index_store_mb": index_size(index_dir) / 1e6,
+        }
+
+    t0 = time.perf_counter()
+    images, paths = load_dataset(dataset_dir)
+    dataset = list(zip(images, paths))
+    load_time = time.perf_counter() - t0
+
+    row = {
+        "images": len(dataset),
+        "load_s": load_time,
+        "dataset_mb": disk_usage(dataset_dir) / 1e6,
+        # Recorded before any query: query-side SIFT on large
+        # images can dominate the overall peak
+        "load_rss_mb": peak_rss_mb(),
+        **index_row,
+    }
+
+    q_gray = cv2.imread(os.path.join(QUERIES_DIR, logo_query), cv2.IMREAD_GRAYSCALE)
+    t0 = time.perf_counter()
+    run_logo_pipeline(q_gray=q_gray, dataset=dataset)
+    row["logo_query_s"] = time.perf_counter() - t0
+
+    q_path = os.path.join(QUERIES_DIR, object_query)
+    q_gray = cv2.imread(q_path, cv2.IMREAD_GRAYSCALE)
+    q_bgr = cv2.imread(q_path)
+    kp_q, des_q = extract_features(q_gray, mask=text_mask(q_gray), method="ORB")
+    t0 = time.perf_counter()
+    run_object_pipeline(q_gray, q_bgr, kp_q, des_q, dataset)
+    row["object_query_s"] = time.perf_counter() - t0
+
+    row["peak_rss_mb"] = peak_rss_mb()
+    return row
+
+
+# Empirical complexity exponent between two sizes:
+# slope of log(cost) vs log(size). ~1.0 means linear scaling.
+def growth_exponent(n1, t1, n2, t2):
+    if n1 <= 0 or n2 <= n1 or t1 <= 0 or t2 <= 0:
+        return float("nan")
+    return math.log(t2 / t1) / math.log(n2 / n1)
+
+
+# Recall report for the logo orientation prefilter.
+# Every logo query is run once through the full pipeline; recall
+# at each kept fraction follows from the kept candidate set.
+def prefilter_report(fractions, report_path):
+    images, paths = load_dataset(DATASET_DIR)
+    dataset = list(zip(images, paths))
+
+    t0 = time.perf_counter()
+    index = build_orientation_index(dataset)
+    logger.info(
+        f"Orientation index: {len(index[1])} logo images "
+        f"in {time.perf_counter() - t0:.2f}s"
+    )
+
+    rows = []
+    for name in sorted(os.listdir(QUERIES_DIR)):
+        if "logo" not in name.lower():
+            continue
+
+        q_gray = cv2.imread(os.path.join(QUERIES_DIR, name), cv2.IMREAD_GRAYSCALE)
+        if q_gray is None:
+            continue
+
+        full = run_logo_pipeline(q_gray=q_gray, dataset=dataset)
+        q_hist = edge_orientation_hist(extract_edges(q_gray))
+
+        for fraction in fractions:
+            kept = orientation_prefilter(q_hist, index, fraction)
+            row = {"query": name, "fraction": fraction, "kept": len(kept)}
+            row.update(prefilter_recall(full, [dataset[i][1] for i in kept]))
+            rows.append(row)
+
+            logger.info(
+                f"{name} keep={fraction:.2f} ({len(kept)} images): "
+                f"recall@5={row['recall@5']:.2f} recall@all={row['recall@all']:.2f}"
+            )
+
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with open(report_path, "w") as fh:
+        json.dump(rows, fh, indent=2)
+
+    logger.info(f"Prefilter report written to {report_path}")
+
+
+# Overlap of two rankings: share of the reference top-k that
+# is also in the top-k of the compared ranking.
+def topk_overlap(reference, results, top_k=5):
+    ref = [r[0] for r in reference[:top_k]]
+    got = {r[0] for r in results[:top_k]}
+    return sum(p in got for p in ref) / len(ref) if ref else 1.0
+
+
+# Matching time vs retrieval quality for feature budgets.
+# Each setting runs both pipelines on the shipped dataset and is
+# compared with the unbudgeted run (the reference ranking).
+def budget_report(budgets, selections, logo_query, object_query, report_path):
+    images, paths = load_dataset(DATASET_DIR)
+    dataset = list(zip(images, paths))
+
+    q_logo = cv2.imread(os.path.join(QUERIES_DIR, logo_query), cv2.IMREAD_GRAYSCALE)
+    q_path = os.path.join(QUERIES_DIR, object_query)
+    q_gray = cv2.imread(q_path, cv2.IMREAD_GRAYSCALE)
+    q_bgr = cv2.imread(q_path)
+    kp_q, des_q = extract_features(q_gray, mask=text_mask(q_gray), method="ORB")
+
+    def run(budget, selection):
+        t0 = time.perf_counter()
+        logo = run_logo_pipeline(
+            q_gray=q_logo, dataset=dataset,
+            sift_budget=budget, sift_selection=selection
+        )
+        logo_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        obj = run_object_pipeline(
+            q_gray, q_bgr, kp_q, des_q, dataset,
+            budget=budget, selection=selection
+        )
+        return logo, logo_s, obj, time.perf_counter() - t0
+
+    ref_logo, ref_logo_s, ref_obj, ref_obj_s = run(None, None)
+    rows = [{
+        "budget": None, "selection": None,
+        "logo_query_s": ref_logo_s, "object_query_s": ref_obj_s,
+        "logo_overlap@5": 1.0, "object_overlap@5": 1.0,
+    }]
+
+    for budget in budgets:
+        for selection in selections:
+            logo, logo_s, obj, obj_s = run(budget, selection)
+            row = {
+                "budget": budget,
+                "selection": selection,
+                "logo_query_s": logo_s,
+                "object_query_s": obj_s,
+                "logo_overlap@5": topk_overlap(ref_logo, logo),
+                "object_overlap@5": topk_overlap(ref_obj, obj),
+            }
+            rows.append(row)
+
+            logger.info(
+                f"budget={budget} selection={selection}: "
+                f"logo {logo_s:.2f}s (overlap@5={row['logo_overlap@5']:.2f}) | "
+                f"object {obj_s:.2f}s (overlap@5={row['object_overlap@5']:.2f})"
+            )
+
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with open(report_path, "w") as fh:
+        json.dump(rows, fh, indent=2)
+
+    logger.info(f"Budget report written to {report_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="SIF scaling benchmark"
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000],
+        help="Synthetic dataset sizes to benchmark"
+    )
+    parser.add_argument("--logo-query", default="apple-logo.jpg")
+    parser.add_argument("--object-query", default="laptop-q1.jpg")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--report", default="logs/scaling_report.json",
+        help="Where to write the JSON scaling report"
+    )
+    parser.add_argument(
+        "--with-index", action="store_true",
+        help="Also time the offline index build and record its size"
+    )
+    parser.add_argument(
+        "--prefilter-recall", type=float, nargs="+", default=None,
+        metavar="FRACTION",
+        help="Instead of scaling, report logo prefilter recall "
+             "on the shipped dataset for these kept fractions"
+    )
+    parser.add_argument(
+        "--budget-sweep", nargs="+", default=None, metavar="N|area",
+        help="Instead of scaling, compare query time and top-5 overlap "
+             "with the unbudgeted pipelines for these feature budgets"
+    )
+    parser.add_argument(
+        "--selections", nargs="+", default=["strongest", "grid", "anms"],
+        choices=["strongest", "grid", "anms"],
+        help="Keypoint selection strategies for --budget-sweep"
+    )
+    args = parser.parse_args()
+
+    setup_logger(log_file="logs/benchmark.log")
+
+    if args.budget_sweep:
+        budget_report(
+            [b if b == "area" else int(b) for b in args.budget_sweep],
+            [None if s == "strongest" else s for s in args.selections],
+            args.logo_query, args.object_query, "logs/budget_report.json"
+        )
+        return
+
+    if args.prefilter_recall:
+        prefilter_report(args.prefilter_recall, "logs/prefilter_report.json")
+        return
+
+    logger.info(f"Scaling benchmark for sizes: {args.sizes}")
+
+    # Each size is measured in a freshly spawned interpreter
+    ctx = mp.get_context("spawn")
+
+    rows = []
+    for size in sorted(args.sizes):
+        dataset_dir = synthesize_dataset(DATASET_DIR, SYNTHETIC_DIR, size, seed=args.seed)
+
+        # Executor workers are not daemonic, so the index
+        # build can start its own process pool inside
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            row = pool.submit(
+                measure_size,
+                dataset_dir, args.logo_query, args.object_query, args.with_index
+            ).result()
+        row["size"] = size
+        rows.append(row)
+
+        logger.info(
+            f"n={row['images']:>7} load={row['load_s']:.2f}s "
+            f"logo={row['logo_query_s']:.2f}s object={row['object_query_s']:.2f}s "
+            f"rss={row['load_rss_mb']:.0f}/{row['peak_rss_mb']:.0f}MB "
+            f"disk={row['dataset_mb']:.1f}MB"
+        )
+        if args.with_index:
+            logger.info(
+                f"index build={row['index_build_s']:.2f}s "
+                f"size={row['index_store_mb']:.1f}MB"
+            )
+
+    # --------------------------------------------------
+    # Growth exponents between consecutive sizes.
+    # Values well above 1.0 flag super-linear regressions.
+    # --------------------------------------------------
+    for prev, cur in zip(rows, rows[1:]):
+        keys = ["load_s", "logo_query_s", "object_query_s", "load_rss_mb"]
+        if args.with_index:
+            keys.append("index_build_s")
+        for key in keys:
+            cur[f"{key}_exponent"] = growth_exponent(
+                prev["images"], prev[key], cur["images"], cur[key]
+            )
+        logger.info(
+            f"{prev['images']} -> {cur['images']}: "
+            f"load^{cur['load_s_exponent']:.2f} "
+            f"logo^{cur['logo_query_s_exponent']:.2f} "
+            f"object^{cur['object_query_s_exponent']:.2f} "
+            f"rss^{cur['load_rss_mb_exponent']:.2f}"
+        )
+
+    os.makedirs(os.path.dirname(args.report), exist_ok=True)
+    with open(args.report, "w") as fh:
+        json.dump(rows, fh, indent=2)
+
+    logger.info(f"Scaling report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
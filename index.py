@@ -0,0 +1,377 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+# --------------------------------------------------
+# Offline index construction.
+# Precomputes, per dataset image, everything the
+# pipelines would otherwise recompute per query:
+#  - ORB and SIFT keypoints / descriptors
+#  - HSV color histogram (stored sparse)
+#  - top contours, their Hu vectors and complexities
+#  - global edge-orientation histogram
+#
+# Region mode indexes logo images per annotated box
+# instead (see describe_regions).
+# --------------------------------------------------
+from pipelines.object_pipeline.features import extract_features
+from pipelines.object_pipeline.color import compute_hsv_hist
+from pipelines.logo_pipeline.edges import (
+    extract_edges, extract_contours, edge_orientation_hist
+)
+from pipelines.logo_pipeline.shape import hu_vector
+from pipelines.logo_pipeline.compact import SiftCodec, CODEC_FILE, load_sift_codec
+from utils.helpers import select_top_contours, contour_complexity
+from utils.logger import setup_logger, logger
+from utils.dataset import dataset_version, list_images
+from utils.image_pack import build_image_pack
+from utils.annotations import LOGO_DIR, load_logo_annotations
+from utils.index_store import (
+    keypoints_to_array, save_chunk, chunk_path,
+    read_manifest, write_manifest, index_size
+)
+
+DATASET_DIR = "data/dataset"
+INDEX_DIR = "index"
+REGION_INDEX_DIR = "index_regions"
+PACK_DIR = "pack"
+
+# Images whose SIFT descriptors train the PCA basis of compact
+# SIFT. They are spaced evenly over the sorted path list, so the
+# sample covers every category; a few hundred descriptors per
+# image give enough rows for a stable 128-dim covariance.
+PCA_IMAGES = 64
+
+
+# Compute all reusable features of a single image.
+# Returns None for unreadable files.
+def describe_image(path):
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    bgr = cv2.imread(path)
+    if gray is None or bgr is None:
+        return None
+
+    kp_orb, des_orb = extract_features(gray, method="ORB")
+    kp_sift, des_sift = extract_features(gray, method="SIFT")
+
+    # HSV histograms are mostly empty: keep non-zero bins only
+    hist = compute_hsv_hist(bgr).ravel()
+    hist_idx = np.flatnonzero(hist).astype(np.int32)
+
+    edges = extract_edges(gray)
+    contours = select_top_contours(extract_contours(edges), k=3)
+
+    return {
+        "path": path,
+        "shape": np.array(gray.shape[:2], dtype=np.int32),
+        "orb_kp": keypoints_to_array(kp_orb),
+        "orb_des": des_orb if des_orb is not None else np.zeros((0, 32), np.uint8),
+        "sift_kp": keypoints_to_array(kp_sift),
+        "sift_des": des_sift if des_sift is not None else np.zeros((0, 128), np.float32),
+        "hist_idx": hist_idx,
+        "hist_val": hist[hist_idx].astype(np.float32),
+        **contour_fields(contours),
+        "orientation": edge_orientation_hist(edges),
+    }
+
+
+# Compute the logo features of each annotated box of an image:
+# contours, Hu vectors and SIFT restricted to the box, one
+# labeled record per box. Images without annotations yield a
+# single unlabeled record covering the whole image.
+def describe_regions(path, boxes=None):
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return []
+
+    h, w = gray.shape[:2]
+    if not boxes:
+        boxes = [("", (0, 0, w, h))]
+
+    sift = cv2.SIFT_create()
+    records = []
+    for label, (x1, y1, x2, y2) in boxes:
+        # Annotations may exceed the image bounds
+        x1, y1, x2, y2 = max(x1, 0), max(y1, 0), min(x2, w), min(y2, h)
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            continue
+
+        # Contours of the crop, shifted back to image coordinates
+        crop = gray[y1:y2, x1:x2]
+        contours = select_top_contours(extract_contours(extract_edges(crop)), k=3)
+        contours = [c + np.array([x1, y1], dtype=c.dtype) for c in contours]
+
+        # SIFT on the full image, masked to the box: descriptors
+        # near the box border still see their neighbourhood
+        mask = np.zeros_like(gray)
+        mask[y1:y2, x1:x2] = 255
+        kp, des = sift.detectAndCompute(gray, mask)
+
+        records.append({
+            "path": path,
+            "label": label,
+            "box": np.array([x1, y1, x2, y2], dtype=np.int32),
+            "sift_kp": keypoints_to_array(kp),
+            "sift_des": des if des is not None else np.zeros((0, 128), np.float32),
+            **contour_fields(contours),
+        })
+
+    return records
+
+
+# Contour fields shared by image and region records.
+def contour_fields(contours):
+    return {
+        "contour_points": (
+            np.concatenate([c.reshape(-1, 2) for c in contours]).astype(np.int32)
+            if contours else np.zeros((0, 2), np.int32)
+        ),
+        "contour_lengths": np.array([len(c) for c in contours], dtype=np.int32),
+        "contour_complexity": np.array(
+            [contour_complexity(c) for c in contours], dtype=np.int32
+        ),
+        "hu": (
+            np.stack([hu_vector(c) for c in contours])
+            if contours else np.zeros((0, 7), np.float64)
+        ),
+    }
+
+
+# Worker initializer: parallelism comes from the process pool,
+# so OpenCV's own thread pool would only oversubscribe the CPUs.
+def init_worker():
+    cv2.setNumThreads(1)
+
+
+# Worker entry point: describe and write one chunk.
+# In region mode, `annotations` holds the boxes of the chunk's images.
+# With a SiftCodec, SIFT descriptors are stored in compact form.
+def build_chunk(index_dir, chunk_id, paths, annotations=None, codec=None):
+    if annotations is None:
+        records = [r for r in map(describe_image, paths) if r is not None]
+    else:
+        records = [r for p in paths for r in describe_regions(p, annotations.get(p))]
+
+    if codec is not None:
+        for rec in records:
+            rec["sift_des"] = codec.encode(rec["sift_des"])
+
+    if records:
+        save_chunk(chunk_path(index_dir, chunk_id), records)
+    return chunk_id, len(paths), len(records)
+
+
+# Learn the compact SIFT codec on evenly spaced sample images.
+def fit_sift_codec(paths, pca_dim):
+    if pca_dim is None:
+        return SiftCodec()
+
+    sample = paths[::max(1, len(paths) // PCA_IMAGES)][:PCA_IMAGES]
+    descriptors = []
+    for p in sample:
+        gray = cv2.imread(p, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            continue
+        _, des = extract_features(gray, method="SIFT")
+        if des is not None:
+            descriptors.append(des)
+
+    logger.info(
+        f"Compact SIFT: PCA-{pca_dim} learned on "
+        f"{sum(len(d) for d in descriptors)} descriptors of {len(descriptors)} images"
+    )
+    return SiftCodec.fit(descriptors, pca_dim)
+
+
+def build_index(dataset_dir=DATASET_DIR, index_dir=INDEX_DIR, workers=None,
+                chunk_size=64, regions=False, compact_sift=False, pca_dim=None):
+    """
+    Build (or resume building) the offline feature index.
+
+    Images are split into fixed chunks over the sorted path list;
+    chunks are described in a process pool and written one file
+    each. The manifest records completed chunks after every chunk,
+    so a killed build resumes from the last finished chunk. A build
+    is restarted from scratch only if the dataset manifest, the
+    chunk size or the mode changed.
+
+    With `regions`, only logo images are indexed, one record per
+    annotated box (see describe_regions).
+
+    With `compact_sift`, SIFT descriptors are stored as uint8
+    RootSIFT codes, projected on `pca_dim` PCA components if set.
+    The codec is saved next to the chunks (see compact.SiftCodec).
+    """
+    os.makedirs(index_dir, exist_ok=True)
+
+    # Chunk boundaries follow the sorted path list,
+    # so they are stable across resumed runs
+    paths = list_images(dataset_dir)
+    annotations = None
+    if regions:
+        paths = [p for p in paths if LOGO_DIR in p]
+        annotations = load_logo_annotations(dataset_dir)
+        logger.info(
+            f"Region index: {sum(p in annotations for p in paths)}/{len(paths)} "
+            f"logo images annotated"
+        )
+    version = dataset_version(dataset_dir)
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+
+    compact = {"pca_dim": pca_dim} if compact_sift else None
+
+    manifest = read_manifest(index_dir)
+    if (
+        manifest is None or
+        manifest["version"] != version or
+        manifest["chunk_size"] != chunk_size or
+        manifest.get("regions", False) != regions or
+        manifest.get("compact_sift") != compact
+    ):
+        if manifest is not None:
+            logger.info("Dataset, chunk size or mode changed, rebuilding index")
+        manifest = {
+            "version": version,
+            "dataset": dataset_dir,
+            "chunk_size": chunk_size,
+            "regions": regions,
+            "compact_sift": compact,
+            "num_chunks": len(chunks),
+            "num_images": len(paths),
+            "done": [],
+            "empty": [],
+        }
+        write_manifest(index_dir, manifest)
+
+        # A codec left by a previous build no longer applies
+        if os.path.exists(os.path.join(index_dir, CODEC_FILE)):
+            os.remove(os.path.join(index_dir, CODEC_FILE))
+
+    # --------------------------------------------------
+    # Compact SIFT codec: learned once per build and kept
+    # on disk, so resumed chunks use the same PCA basis.
+    # --------------------------------------------------
+    codec = None
+    if compact_sift:
+        codec = load_sift_codec(index_dir) if manifest["done"] else None
+        if codec is None:
+            codec = fit_sift_codec(paths, pca_dim)
+            codec.save(os.path.join(index_dir, CODEC_FILE))
+
+    done = set(manifest["done"])
+    empty = set(manifest.get("empty", []))
+    todo = [
+        i for i in range(len(chunks))
+        if i not in done or (i not in empty and not os.path.exists(chunk_path(index_dir, i)))
+    ]
+
+    total = sum(len(chunks[i]) for i in todo)
+    logger.info(
+        f"Index: {len(paths)} images in {len(chunks)} chunks, "
+        f"{len(chunks) - len(todo)} already done, {total} images to process"
+    )
+
+    # --------------------------------------------------
+    # Parallel build with per-chunk checkpointing.
+    # --------------------------------------------------
+    start = time.perf_counter()
+    processed = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        futures = [
+            pool.submit(
+                build_chunk, index_dir, i, chunks[i],
+                None if annotations is None else
+                {p: annotations[p] for p in chunks[i] if p in annotations},
+                codec
+            )
+            for i in todo
+        ]
+
+        for fut in as_completed(futures):
+            chunk_id, n_paths, n_records = fut.result()
+
+            # Chunks without records have no file; recording them
+            # lets readers tell them apart from missing chunks
+            done.add(chunk_id)
+            if n_records == 0:
+                empty.add(chunk_id)
+            manifest["done"] = sorted(done)
+            manifest["empty"] = sorted(empty)
+            write_manifest(index_dir, manifest)
+
+            processed += n_paths
+            elapsed = time.perf_counter() - start
+            rate = processed / elapsed if elapsed > 0 else 0.0
+            eta = (total - processed) / rate if rate > 0 else float("inf")
+            logger.info(
+                f"Chunk {chunk_id} done ({n_records} records, {n_paths} images) | "
+                f"{processed}/{total} | {rate:.1f} images/s | ETA {eta:.0f}s"
+            )
+
+    logger.info(
+        f"Index complete: {len(paths)} images, "
+        f"{index_size(index_dir) / 1e6:.1f} MB in {index_dir}"
+    )
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="SIF offline index and image pack"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Build or resume the feature index")
+    build.add_argument("--dataset", default=DATASET_DIR)
+    build.add_argument(
+        "--out", default=None,
+        help=f"Index directory (default: {INDEX_DIR}, or {REGION_INDEX_DIR} with --regions)"
+    )
+    build.add_argument(
+        "--workers", type=int, default=None,
+        help="Worker processes (default: number of CPUs)"
+    )
+    build.add_argument("--chunk-size", type=int, default=64)
+    build.add_argument(
+        "--regions", action="store_true",
+        help="Index annotated logo boxes instead of whole images"
+    )
+    build.add_argument(
+        "--compact-sift", action="store_true",
+        help="Store SIFT descriptors as uint8 RootSIFT codes"
+    )
+    build.add_argument(
+        "--pca-dim", type=int, default=None,
+        help="Also reduce compact SIFT to this many PCA dimensions"
+    )
+
+    pack = sub.add_parser("pack", help="Decode all images into an image pack")
+    pack.add_argument("--dataset", default=DATASET_DIR)
+    pack.add_argument("--out", default=PACK_DIR)
+    pack.add_argument(
+        "--bgr-scale", type=float, default=None,
+        help="Also store BGR images resized by this factor "
+             "(used by the color pre-filter)"
+    )
+
+    args = parser.parse_args()
+
+    setup_logger(log_file="logs/index.log")
+
+    if args.command == "build":
+        out = args.out or (REGION_INDEX_DIR if args.regions else INDEX_DIR)
+        build_index(
+            args.dataset, out, args.workers, args.chunk_size, args.regions,
+            args.compact_sift or args.pca_dim is not None, args.pca_dim
+        )
+    elif args.command == "pack":
+        build_image_pack(args.dataset, args.out, args.bgr_scale)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,29 +7,33 @@ import os
 #  - logging: centralized experiment tracking
 #  - dataset: unified dataset loading interface
 #  - visualize: qualitative evaluation of results
+#  - cache: ranked results of previously seen queries
 # --------------------------------------------------
 from utils.logger import setup_logger, logger
-from utils.dataset import load_dataset
+from utils.dataset import load_dataset, dataset_version, list_images
 from utils.visualize import show_matches, show_logo_result
+from utils.cache import ResultCache, file_digest, make_cache_key
+from utils.image_pack import open_image_pack
+from utils.index_store import index_digest
 
 # --------------------------------------------------
 # Object retrieval pipeline components.
 # Each module corresponds to a distinct CBIR stage:
 #  - features: local feature extraction
 #  - masking: removal of text/noisy regions
-#  - matching: descriptor-level matching
-#  - geometry: geometric verification (RANSAC)
-#  - color: global color-based pre-filtering
-#  - scoring: fusion of heterogeneous similarity cues
 #  - query_analysis: heuristic query type estimation
+# The remaining stages (color, matching, geometry,
+# scoring) are chained inside run_object_pipeline.
 # --------------------------------------------------
+from pipelines.object_pipeline import (
+    run_object_pipeline, run_object_pipeline_global, MIN_MATCHES_OBJECT
+)
+from pipelines.object_pipeline.global_matching import (
+    descriptor_matrix_from_dataset, descriptor_matrix_from_index
+)
 from pipelines.object_pipeline.features import extract_features
 from pipelines.object_pipeline.masking import text_mask
-from pipelines.object_pipeline.matching import ratio_test_match
-from pipelines.object_pipeline.geometry import ransac_filter
-from pipelines.object_pipeline.color import color_prefilter
-from pipelines.object_pipeline.scoring import compute_final_score, spatial_consistency
-from pipelines.object_pipeline.query_analysis import analyze_query
+from pipelines.object_pipeline.query_analysis import route_query
 
 # --------------------------------------------------
 # Logo retrieval pipeline:
@@ -37,6 +41,42 @@ from pipelines.object_pipeline.query_analysis import analyze_query
 # shape-based cues, SIFT descriptors and score fusion.
 # --------------------------------------------------
 from pipelines.logo_pipeline import run_logo_pipeline
+from pipelines.logo_pipeline.regions import load_region_index, run_logo_region_pipeline
+from pipelines.logo_pipeline.compact import SiftCodec, load_sift_codec
+from pipelines.logo_pipeline.prefilter import (
+    build_orientation_index, orientation_index_from_index
+)
+
+# --------------------------------------------------
+# Pipeline parameters that determine a ranking.
+# Collected into the result cache key, so that any
+# threshold or weight change yields fresh results.
+# --------------------------------------------------
+from pipelines.object_pipeline.color import COLOR_SIM_THRESHOLD
+from pipelines.object_pipeline.features import ORB_NFEATURES
+from pipelines.object_pipeline.matching import RATIO_TEST
+from pipelines.object_pipeline.geometry import RANSAC_THRESH
+from pipelines.object_pipeline.scoring import compute_final_score
+from pipelines.logo_pipeline import (
+    COMPLEXITY_TOLERANCE, SHAPE_GATE, SHAPE_HU_WEIGHT, SHAPE_CONTOUR_WEIGHT,
+    SIFT_RATIO, SIFT_MATCH_CAP, LOGO_SCORE_THRESHOLD
+)
+from pipelines.logo_pipeline.score_fusion import fuse_scores
+
+# --------------------------------------------------
+# Batch engine:
+# Serves several queries with one pass over the dataset.
+# --------------------------------------------------
+from pipelines.batch_pipeline import run_batch_pipeline
+
+# --------------------------------------------------
+# Staged execution:
+# Streams images through decode / feature / matching
+# stages connected by bounded queues.
+# --------------------------------------------------
+from pipelines.staged_pipeline import (
+    run_object_pipeline_staged, run_logo_pipeline_staged
+)
 
 # --------------------------------------------------
 # Global paths.
@@ -45,14 +85,26 @@ from pipelines.logo_pipeline import run_logo_pipeline
 # --------------------------------------------------
 DATASET_DIR = "data/dataset"
 QUERIES_DIR = "data/queries"
+CACHE_DIR = "cache/results"
+PACK_DIR = "pack"
+REGION_INDEX_DIR = "index_regions"
+
+# Per-query options the batch engine does not support
+BATCH_UNSUPPORTED = [
+    "logo_prefilter", "logo_roi", "feature_budget", "keypoint_selection",
+    "global_matching", "index", "wgc", "regions", "label", "compact_sift",
+    "staged", "workers",
+]
 
-# --------------------------------------------------
-# Minimum number of matches required for the object
-# pipeline. This empirical threshold prevents:
-#  - unstable homography estimation
-#  - accidental matches due to noise
-# --------------------------------------------------
-MIN_MATCHES_OBJECT = 10
+
+# Feature budget argument: a positive integer or "area".
+def parse_budget(value):
+    if value == "area":
+        return value
+    budget = int(value)
+    if budget <= 0:
+        raise argparse.ArgumentTypeError("feature budget must be positive")
+    return budget
 
 
 def main():
@@ -67,26 +119,164 @@ def main():
     parser.add_argument(
         "--query",
         required=True,
-        help="Query image filename (from data/queries)"
+        nargs="+",
+        help="Query image filename(s) (from data/queries); "
+             "several names are served as one batch"
+    )
+    parser.add_argument(
+        "--logo-prefilter",
+        type=float,
+        default=None,
+        metavar="FRACTION",
+        help="Keep only this fraction of logo images after the "
+             "edge-orientation prefilter (logo pipeline only)"
+    )
+    parser.add_argument(
+        "--logo-roi",
+        type=float,
+        default=None,
+        metavar="MARGIN",
+        help="Restrict database SIFT to the boxes of the best-matching "
+             "contours, enlarged by MARGIN (logo pipeline only)"
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse ranked results of identical queries across runs"
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Expire cached results after this many seconds"
+    )
+    parser.add_argument(
+        "--feature-budget",
+        type=parse_budget,
+        default=None,
+        metavar="N|area",
+        help="Cap dataset-image features (ORB for objects, SIFT for "
+             "logos) at N, or scale the cap with the image area"
+    )
+    parser.add_argument(
+        "--keypoint-selection",
+        choices=["grid", "anms"],
+        default=None,
+        help="Spread budgeted keypoints over the image instead of "
+             "keeping the strongest ones"
+    )
+    parser.add_argument(
+        "--global-matching",
+        action="store_true",
+        help="Match the query against all dataset descriptors at once "
+             "and verify only the images with the most votes; faster "
+             "than per-image matching only with --index, which skips "
+             "dataset feature extraction"
+    )
+    parser.add_argument(
+        "--index",
+        default=None,
+        metavar="DIR",
+        help="Offline index (index.py build) providing the dataset "
+             "descriptors for --global-matching and the orientation "
+             "histograms for --logo-prefilter"
+    )
+    parser.add_argument(
+        "--wgc",
+        action="store_true",
+        help="Keep only matches consistent in scale and rotation "
+             "(weak geometric consistency) before scoring"
+    )
+    parser.add_argument(
+        "--regions",
+        nargs="?",
+        const=REGION_INDEX_DIR,
+        default=None,
+        metavar="DIR",
+        help="Answer logo queries from a region index of annotated "
+             f"logo boxes (index.py build --regions, default {REGION_INDEX_DIR})"
+    )
+    parser.add_argument(
+        "--label",
+        default=None,
+        help="Only search logo regions of this class (with --regions)"
+    )
+    parser.add_argument(
+        "--compact-sift",
+        action="store_true",
+        help="Match logo SIFT descriptors as uint8 RootSIFT codes "
+             "(indexes built with --compact-sift always use their codec)"
+    )
+    parser.add_argument(
+        "--pack",
+        nargs="?",
+        const=PACK_DIR,
+        default=None,
+        metavar="DIR",
+        help="Read pre-decoded images from an image pack "
+             f"(index.py pack, default {PACK_DIR}) instead of decoding files"
+    )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        help="Stream images through pipelined decode / feature / "
+             "matching stages instead of preloading the dataset"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes per CPU-bound stage (with --staged)"
     )
     args = parser.parse_args()
 
+    # --------------------------------------------------
+    # Result cache (optional).
+    # Bound to the current dataset manifest, so any change
+    # in data/dataset invalidates previously stored results.
+    # Results served from an offline index are also keyed
+    # by that index build (see effective_config).
+    # --------------------------------------------------
+    cache = None
+    if args.cache:
+        cache = ResultCache(
+            dataset_version(DATASET_DIR), ttl=args.cache_ttl, disk_dir=CACHE_DIR
+        )
+
+    if len(args.query) > 1:
+        ignored = [
+            f"--{name.replace('_', '-')}" for name in BATCH_UNSUPPORTED
+            if getattr(args, name) not in (None, False)
+        ]
+        run_batch(args.query, cache, args.pack, ignored)
+        return
+
+    query = args.query[0]
+
     # --------------------------------------------------
     # Logger initialization.
     # A separate log file is created per query image,
     # which is critical for debugging and reproducibility.
     # --------------------------------------------------
-    setup_logger(log_file=f"logs/{args.query}.log")
+    setup_logger(log_file=f"logs/{query}.log")
 
     logger.info("Starting Smart Image Finder")
-    logger.info(f"Query image: {args.query}")
+    logger.info(f"Query image: {query}")
+
+    # Pre-decoded dataset images (optional)
+    pack = open_image_pack(args.pack, DATASET_DIR) if args.pack else None
+    read_gray = (
+        pack.read_gray if pack is not None
+        else lambda p: cv2.imread(p, cv2.IMREAD_GRAYSCALE)
+    )
 
     # --------------------------------------------------
     # Query image loading:
     #  - grayscale: feature extraction
     #  - BGR: color-based pre-filtering
     # --------------------------------------------------
-    q_path = os.path.join(QUERIES_DIR, args.query)
+    q_path = os.path.join(QUERIES_DIR, query)
     q_gray = cv2.imread(q_path, cv2.IMREAD_GRAYSCALE)
     q_bgr = cv2.imread(q_path)
 
@@ -124,28 +314,119 @@ def main():
     # This is not a learned classifier, but an explicit,
     # interpretable heuristic used to route the query
     # to the appropriate retrieval pipeline.
+    #
+    # A filename-based manual override is applied on top
+    # for experimental control. This is intentionally
+    # explicit and not hidden, as it affects the
+    # evaluation protocol.
     # --------------------------------------------------
-    query_type = analyze_query(len(kp_q), q_gray.shape)
-
-    # Manual override for experimental control.
-    # This is intentionally explicit and not hidden,
-    # as it affects the evaluation protocol.
-    if "logo" in args.query.lower():
-        logger.info("Forcing LOGO pipeline (filename heuristic)")
-        query_type = "logo"
-    elif "airplane" in args.query.lower() or "laptop" in args.query.lower() or "camera" in args.query.lower():
-        query_type = "object"
+    query_type = route_query(query, len(kp_q), q_gray.shape)
 
     logger.info(f"Query type detected: {query_type}")
 
+    # --------------------------------------------------
+    # Execution mode. A region index replaces the whole
+    # logo pipeline; staged mode supports neither the
+    # orientation prefilter nor global matching.
+    # --------------------------------------------------
+    use_regions = query_type == "logo" and args.regions is not None
+    global_matching = args.global_matching and not args.staged and not use_regions
+    use_prefilter = (
+        query_type == "logo" and args.logo_prefilter is not None and
+        not args.staged and not use_regions
+    )
+    if args.staged and not use_regions:
+        if args.logo_prefilter is not None:
+            logger.warning("--logo-prefilter is not supported with --staged, ignored")
+        if args.global_matching:
+            logger.warning("--global-matching is not supported with --staged, ignored")
+
+    # Compact SIFT codec of the logo pipeline, if any
+    sift_codec = resolve_sift_codec(query_type, args, global_matching)
+
+    # ==================================================
+    # Result cache lookup
+    # ==================================================
+    # A hit skips dataset loading and both pipelines.
+    # Only (path, score) pairs are cached, so the best hit
+    # is shown side by side rather than with its matches.
+    # --------------------------------------------------
+    if cache is not None:
+        cache_key = make_cache_key(
+            file_digest(q_path),
+            cache.version,
+            effective_config(
+                query_type, args, use_regions, global_matching, use_prefilter,
+                pack, sift_codec
+            )
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info("Serving cached results")
+            cache.report()
+            if not cached:
+                logger.warning("No matches found")
+                return
+
+            for i, (path, score) in enumerate(cached[:5]):
+                logger.info(f"{i+1}. {path} -> score={score:.4f}")
+
+            best_path, best_score = cached[0]
+            best_img = read_gray(best_path)
+            show_logo_result(q_gray, best_img, best_score)
+            return
+
     # ==================================================
     # Dataset loading
     # ==================================================
     # All dataset images are loaded once to avoid repeated
-    # disk I/O during the retrieval loops.
+    # disk I/O during the retrieval loops. In staged mode
+    # images are decoded on the fly, overlapped with the
+    # matching of previously decoded images. A region index
+    # already holds everything the logo pipeline needs.
+    # --------------------------------------------------
+    if use_regions:
+        try:
+            regions = load_region_index(args.regions)
+        except (FileNotFoundError, ValueError) as e:
+            logger.error(str(e))
+            return
+    elif args.staged:
+        paths = list_images(DATASET_DIR)
+    else:
+        if pack is not None:
+            images, paths = pack.load_dataset()
+        else:
+            images, paths = load_dataset(DATASET_DIR)
+        dataset = list(zip(images, paths))
+
+    # --------------------------------------------------
+    # Global descriptor matrix (optional).
+    # Taken from the offline index when available, which
+    # avoids extracting features of every image per query.
+    # --------------------------------------------------
+    db = None
+    if global_matching:
+        try:
+            db = build_descriptor_matrix(query_type, dataset, args, sift_codec)
+        except (FileNotFoundError, ValueError) as e:
+            logger.error(str(e))
+            return
+
     # --------------------------------------------------
-    images, paths = load_dataset(DATASET_DIR)
-    dataset = list(zip(images, paths))
+    # Orientation index of the logo prefilter, built once
+    # per dataset load (or read from the offline index).
+    # --------------------------------------------------
+    orientation_index = None
+    if use_prefilter:
+        try:
+            orientation_index = (
+                orientation_index_from_index(args.index, dataset)
+                if args.index is not None else build_orientation_index(dataset)
+            )
+        except (FileNotFoundError, ValueError) as e:
+            logger.error(str(e))
+            return
 
     # ==================================================
     # LOGO PIPELINE
@@ -155,10 +436,43 @@ def main():
 
         # Specialized logo retrieval:
         # shape-based filtering → SIFT matching → score fusion
-        logo_results = run_logo_pipeline(
-            q_gray=q_gray,
-            dataset=dataset
-        )
+        if use_regions:
+            logo_results = run_logo_region_pipeline(
+                q_gray=q_gray,
+                regions=regions,
+                label=args.label,
+                wgc=args.wgc,
+                sift_codec=sift_codec
+            )
+        elif args.staged:
+            logo_results = run_logo_pipeline_staged(
+                q_gray=q_gray,
+                paths=paths,
+                roi_margin=args.logo_roi,
+                sift_budget=args.feature_budget,
+                sift_selection=args.keypoint_selection,
+                pack=pack,
+                wgc=args.wgc,
+                sift_codec=sift_codec,
+                cpu_workers=args.workers
+            )
+        else:
+            logo_results = run_logo_pipeline(
+                q_gray=q_gray,
+                dataset=dataset,
+                prefilter_fraction=args.logo_prefilter,
+                orientation_index=orientation_index,
+                roi_margin=args.logo_roi,
+                sift_budget=args.feature_budget,
+                sift_selection=args.keypoint_selection,
+                sift_db=db,
+                wgc=args.wgc,
+                sift_codec=sift_codec
+            )
+
+        if cache is not None:
+            cache.put(cache_key, [(p, sc) for p, sc, _, _ in logo_results])
+            cache.report()
 
         if not logo_results:
             logger.warning("No logo candidates found")
@@ -170,7 +484,7 @@ def main():
 
         # Qualitative visualization of the best logo match
         best_path, best_score, _, _ = logo_results[0]
-        best_img = cv2.imread(best_path, cv2.IMREAD_GRAYSCALE)
+        best_img = read_gray(best_path)
 
         show_logo_result(q_gray, best_img, best_score)
         return
@@ -180,81 +494,58 @@ def main():
     # ==================================================
     logger.info("Running OBJECT pipeline")
 
-    results = []
-
-    for img_gray, path in dataset:
-        # BGR image is required only for color pre-filtering
-        db_bgr = cv2.imread(path)
-        if db_bgr is None:
-            continue
-
-        # --------------------------------------------------
-        # Color-based pre-filtering:
-        # Significantly reduces the search space before
-        # expensive geometric verification.
-        # --------------------------------------------------
-        passed, color_score = color_prefilter(q_bgr, db_bgr)
-        if not passed:
-            continue
-
-        # --------------------------------------------------
-        # Local descriptor matching
-        # --------------------------------------------------
-        kp_d, des_d = extract_features(img_gray, method="ORB")
-        matches = ratio_test_match(des_q, des_d)
-
-        if len(matches) < MIN_MATCHES_OBJECT:
-            continue
-
-        # --------------------------------------------------
-        # Geometric verification:
-        # RANSAC-based homography estimation combined with
-        # inlier counting and spatial coverage estimation.
-        # --------------------------------------------------
-        inliers, inlier_matches, coverage = ransac_filter(
-            kp_q, kp_d, matches, q_gray.shape
+    # Color pre-filter → ORB matching → RANSAC → score fusion
+    if args.staged:
+        results = run_object_pipeline_staged(
+            q_gray=q_gray,
+            q_bgr=q_bgr,
+            kp_q=kp_q,
+            des_q=des_q,
+            paths=paths,
+            budget=args.feature_budget,
+            selection=args.keypoint_selection,
+            pack=pack,
+            wgc=args.wgc,
+            cpu_workers=args.workers
         )
-
-        if inliers == 0:
-            continue
-
-        # --------------------------------------------------
-        # Spatial consistency:
-        # Additional structural coherence check that
-        # complements pure inlier counting.
-        # --------------------------------------------------
-        spatial = spatial_consistency(kp_q, kp_d, inlier_matches)
-
-        # --------------------------------------------------
-        # Score fusion:
-        # The final similarity score aggregates multiple
-        # independent cues into a single scalar value.
-        # --------------------------------------------------
-        final_score = compute_final_score(
-            inliers=inliers,
-            coverage=coverage,
-            color_score=color_score,
-            spatial=spatial
+    elif db is not None:
+        results = run_object_pipeline_global(
+            q_gray=q_gray,
+            q_bgr=q_bgr,
+            kp_q=kp_q,
+            des_q=des_q,
+            db=db,
+            pack=pack,
+            wgc=args.wgc
         )
-
-        results.append(
-            (path, final_score, inlier_matches, kp_d)
+    else:
+        results = run_object_pipeline(
+            q_gray=q_gray,
+            q_bgr=q_bgr,
+            kp_q=kp_q,
+            des_q=des_q,
+            dataset=dataset,
+            budget=args.feature_budget,
+            selection=args.keypoint_selection,
+            pack=pack,
+            wgc=args.wgc
         )
 
+    if cache is not None:
+        cache.put(cache_key, [(p, sc) for p, sc, _, _ in results])
+        cache.report()
+
     if not results:
         logger.warning("No object matches found")
         return
 
-    # Sort results by descending final score
-    results.sort(key=lambda x: x[1], reverse=True)
-
     logger.info("Top object results:")
     for i, (path, score, _, _) in enumerate(results[:5]):
         logger.info(f"{i+1}. {path} -> score={score:.4f}")
 
     # Qualitative visualization of the best object match
     best_path, _, best_matches, best_kp = results[0]
-    best_img = cv2.imread(best_path, cv2.IMREAD_GRAYSCALE)
+    best_img = read_gray(best_path)
 
     show_matches(
         q_gray,
@@ -265,5 +556,220 @@ def main():
     )
 
 
+# Everything that changes the ranking of a query type.
+# Part of the result cache key, next to the query content
+# and the dataset version.
+# `index` identifies the offline index the results come from
+# (see index_digest), if any.
+def pipeline_config(query_type, prefilter_fraction=None, roi_margin=None,
+                    feature_budget=None, keypoint_selection=None,
+                    global_matching=False, wgc=False, bgr_scale=None,
+                    index=None, label=None, compact_sift=None):
+    common = {
+        "budget": feature_budget,
+        "selection": keypoint_selection,
+        "global_matching": global_matching,
+        "wgc": wgc,
+        "index": index,
+    }
+
+    if query_type == "logo":
+        return {
+            "pipeline": "logo",
+            "complexity_tolerance": COMPLEXITY_TOLERANCE,
+            "shape_gate": SHAPE_GATE,
+            "shape_weights": (SHAPE_HU_WEIGHT, SHAPE_CONTOUR_WEIGHT),
+            "sift_ratio": SIFT_RATIO,
+            "sift_match_cap": SIFT_MATCH_CAP,
+            "score_threshold": LOGO_SCORE_THRESHOLD,
+            "fusion_weights": fuse_scores.__defaults__,
+            "prefilter_fraction": prefilter_fraction,
+            "roi_margin": roi_margin,
+            "label": label,
+            "compact_sift": compact_sift,
+            **common,
+        }
+
+    return {
+        "pipeline": "object",
+        "min_matches": MIN_MATCHES_OBJECT,
+        "color_threshold": COLOR_SIM_THRESHOLD,
+        "ratio_test": RATIO_TEST,
+        "ransac_thresh": RANSAC_THRESH,
+        "orb_nfeatures": ORB_NFEATURES,
+        "score_weights": compute_final_score.__defaults__,
+        # Downscaled BGR from an image pack changes color scores
+        "bgr_scale": bgr_scale,
+        **common,
+    }
+
+
+# Cache-key configuration of a single query, reduced to the
+# options that actually apply in the chosen execution mode.
+def effective_config(query_type, args, use_regions, global_matching, use_prefilter,
+                     pack, sift_codec):
+    if use_regions:
+        index_dir = args.regions
+    elif (global_matching or use_prefilter) and args.index is not None:
+        index_dir = args.index
+    else:
+        index_dir = None
+
+    # Region and descriptor indexes carry their own features,
+    # so the feature budget does not apply to them
+    budgeted = not use_regions and not (global_matching and args.index is not None)
+    if index_dir is not None and not os.path.isdir(index_dir):
+        index_dir = None
+
+    return pipeline_config(
+        query_type,
+        prefilter_fraction=args.logo_prefilter if use_prefilter else None,
+        roi_margin=args.logo_roi if not use_regions else None,
+        feature_budget=args.feature_budget if budgeted else None,
+        keypoint_selection=args.keypoint_selection if budgeted else None,
+        global_matching=global_matching,
+        wgc=args.wgc,
+        bgr_scale=pack.bgr_scale if pack is not None else None,
+        index=index_digest(index_dir) if index_dir is not None else None,
+        label=args.label if use_regions else None,
+        compact_sift=sift_codec.dim if sift_codec is not None else None
+    )
+
+
+# Compact SIFT codec for a logo query. Descriptors stored in a
+# compact index can only be matched with the codec of that index.
+def resolve_sift_codec(query_type, args, global_matching=False):
+    if query_type != "logo":
+        return None
+
+    if args.regions is not None:
+        index_dir = args.regions
+    elif global_matching and args.index is not None:
+        index_dir = args.index
+    else:
+        index_dir = None
+
+    if index_dir is not None:
+        codec = load_sift_codec(index_dir)
+        if codec is None and args.compact_sift:
+            logger.warning(f"{index_dir} stores float SIFT, --compact-sift ignored")
+        return codec
+
+    return SiftCodec() if args.compact_sift else None
+
+
+# Dataset descriptors of the pipeline a query is routed to:
+# SIFT of the logo images, or ORB of all images.
+def build_descriptor_matrix(query_type, dataset, args, sift_codec=None):
+    if query_type == "logo":
+        method, keep = "SIFT", lambda p: "flickr_logos_27_dataset" in p
+    else:
+        method, keep = "ORB", lambda p: True
+
+    if args.index is not None:
+        if args.feature_budget is not None:
+            logger.warning("--feature-budget does not apply to indexed descriptors")
+        db = descriptor_matrix_from_index(args.index, method, path_filter=keep)
+    else:
+        db = descriptor_matrix_from_dataset(
+            [(img, p) for img, p in dataset if keep(p)], method,
+            budget=args.feature_budget, selection=args.keypoint_selection,
+            sift_codec=sift_codec
+        )
+
+    logger.info(
+        f"Descriptor matrix: {len(db.matrix)} {method} descriptors "
+        f"of {len(db)} images, {db.nbytes() / 1e6:.1f} MB"
+    )
+    return db
+
+
+def run_batch(query_names, cache=None, pack_dir=None, ignored=()):
+    # --------------------------------------------------
+    # Batch mode:
+    # All queries share a single pass over the dataset.
+    # Intended for offline jobs, so results are logged
+    # rather than visualized.
+    # --------------------------------------------------
+    setup_logger(log_file=f"logs/batch-{len(query_names)}.log")
+
+    logger.info("Starting Smart Image Finder (batch mode)")
+    logger.info(f"Query images: {', '.join(query_names)}")
+    for flag in ignored:
+        logger.warning(f"{flag} is not supported with several queries, ignored")
+
+    # Repeated names in one batch are served once
+    query_names = list(dict.fromkeys(query_names))
+
+    pack = open_image_pack(pack_dir, DATASET_DIR) if pack_dir else None
+
+    queries = []
+    for name in query_names:
+        q_path = os.path.join(QUERIES_DIR, name)
+        q_gray = cv2.imread(q_path, cv2.IMREAD_GRAYSCALE)
+        q_bgr = cv2.imread(q_path)
+
+        if q_gray is None or q_bgr is None:
+            logger.error(f"Query image not found or cannot be loaded: {name}")
+            continue
+
+        queries.append((name, q_gray, q_bgr))
+
+    # --------------------------------------------------
+    # Cache lookup: only misses go through the dataset pass.
+    # Routing needs the query keypoint count, so it is
+    # computed here ahead of the batch engine.
+    # --------------------------------------------------
+    ranked = {}
+    keys = {}
+    if cache is not None:
+        misses = []
+        for name, q_gray, q_bgr in queries:
+            kp_q, _ = extract_features(q_gray, mask=text_mask(q_gray), method="ORB")
+            query_type = route_query(name, len(kp_q or []), q_gray.shape)
+            keys[name] = make_cache_key(
+                file_digest(os.path.join(QUERIES_DIR, name)),
+                cache.version,
+                pipeline_config(
+                    query_type, bgr_scale=pack.bgr_scale if pack is not None else None
+                )
+            )
+
+            cached = cache.get(keys[name])
+            if cached is None:
+                misses.append((name, q_gray, q_bgr))
+            else:
+                ranked[name] = cached[:5]
+        queries = misses
+
+    if queries:
+        if pack is not None:
+            images, paths = pack.load_dataset()
+        else:
+            images, paths = load_dataset(DATASET_DIR)
+        dataset = list(zip(images, paths))
+
+        batch_results = run_batch_pipeline(queries, dataset, pack=pack)
+        for name, results in batch_results.items():
+            ranked[name] = [(path, score) for path, score, _, _ in results]
+            if cache is not None:
+                cache.put(keys[name], ranked[name])
+
+    if cache is not None:
+        cache.report()
+
+    for name in query_names:
+        if name not in ranked:
+            continue
+
+        if not ranked[name]:
+            logger.warning(f"[{name}] No matches found")
+            continue
+
+        logger.info(f"[{name}] Top results:")
+        for i, (path, score) in enumerate(ranked[name]):
+            logger.info(f"{i+1}. {path} -> score={score:.4f}")
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,243 @@
+import cv2
+import numpy as np
+
+# --------------------------------------------------
+# Batch retrieval engine.
+# Reuses the primitives of both pipelines, but swaps
+# the loop nesting: the dataset is traversed once and
+# every image is evaluated against all queries.
+# --------------------------------------------------
+from pipelines.object_pipeline import MIN_MATCHES_OBJECT, read_bgr
+from pipelines.object_pipeline.color import (
+    COLOR_SIM_THRESHOLD, compute_hsv_hist, stack_hists, color_similarity_batch
+)
+from pipelines.object_pipeline.features import extract_features
+from pipelines.object_pipeline.masking import text_mask
+from pipelines.object_pipeline.matching import RATIO_TEST, ratio_test
+from pipelines.object_pipeline.geometry import ransac_filter
+from pipelines.object_pipeline.scoring import compute_final_score, spatial_consistency
+from pipelines.object_pipeline.query_analysis import route_query
+from pipelines.logo_pipeline import (
+    COMPLEXITY_TOLERANCE, SHAPE_GATE, SIFT_RATIO, SIFT_MATCH_CAP, LOGO_SCORE_THRESHOLD
+)
+from pipelines.logo_pipeline.edges import extract_edges, extract_contours
+from pipelines.logo_pipeline.shape import (
+    hu_vector, hu_similarity_matrix, shape_similarity,
+    SHAPE_HU_WEIGHT, SHAPE_CONTOUR_WEIGHT
+)
+from pipelines.logo_pipeline.score_fusion import fuse_scores
+from utils.helpers import select_top_contours, contour_complexity
+from utils.logger import logger
+
+
+# Prepare all per-query state once, before the dataset pass.
+# Mirrors the query-side work done in main.py and in the
+# individual pipelines.
+def prepare_queries(queries, sift):
+    prepared = []
+
+    for name, q_gray, q_bgr in queries:
+        mask = text_mask(q_gray)
+        kp_q, des_q = extract_features(q_gray, mask=mask, method="ORB")
+        if kp_q is None or len(kp_q) == 0:
+            logger.warning(f"[{name}] No keypoints detected, skipped")
+            continue
+
+        q = {
+            "name": name,
+            "type": route_query(name, len(kp_q), q_gray.shape),
+            "gray": q_gray,
+            "kp": kp_q,
+            "des": des_q,
+        }
+
+        if q["type"] == "logo":
+            contours = select_top_contours(
+                extract_contours(extract_edges(q_gray)), k=3
+            )
+            kp_s, des_s = sift.detectAndCompute(q_gray, None)
+            if not contours or des_s is None:
+                logger.warning(f"[{name}] No logo shape or SIFT data, skipped")
+                continue
+
+            q["contours"] = contours
+            q["complexities"] = np.array([contour_complexity(c) for c in contours])
+            q["hu"] = np.stack([hu_vector(c) for c in contours])
+            q["kp"], q["des"] = kp_s, des_s
+        else:
+            q["hist"] = compute_hsv_hist(q_bgr)
+
+        prepared.append(q)
+
+    return prepared
+
+
+# Match several query descriptor sets against one image
+# with a single knnMatch call on the stacked descriptors.
+# Matches are demultiplexed back to per-query indices.
+def stacked_knn_match(des_list, des_d, norm, ratio):
+    offsets = np.cumsum([0] + [len(d) for d in des_list])
+    stacked = np.vstack(des_list)
+
+    bf = cv2.BFMatcher(norm)
+    knn = bf.knnMatch(stacked, des_d, k=2)
+
+    per_query = [[] for _ in des_list]
+    for m in ratio_test(knn, ratio=ratio):
+        j = int(np.searchsorted(offsets, m.queryIdx, side="right")) - 1
+        per_query[j].append(
+            cv2.DMatch(m.queryIdx - int(offsets[j]), m.trainIdx, m.distance)
+        )
+
+    return per_query
+
+
+# Logo branch for a single dataset image.
+# Contours and Hu vectors are computed once and compared
+# against the contours of every logo query at once.
+def _score_logo_queries(img_gray, path, logo_queries, sift, results):
+    contours = select_top_contours(
+        extract_contours(extract_edges(img_gray)), k=3
+    )
+    if not contours:
+        return
+
+    d_complexities = np.array([contour_complexity(c) for c in contours])
+    d_hu = np.stack([hu_vector(c) for c in contours])
+
+    candidates = []
+    for q in logo_queries:
+        # Complexity gate: keep contours close to any query contour
+        keep = (
+            np.abs(d_complexities[:, None] - q["complexities"][None, :])
+            <= COMPLEXITY_TOLERANCE
+        ).any(axis=1)
+        if not keep.any():
+            continue
+
+        hu = float(hu_similarity_matrix(q["hu"], d_hu[keep]).max())
+        shape = max(
+            shape_similarity(qc, dc)
+            for qc in q["contours"]
+            for dc, k in zip(contours, keep) if k
+        )
+
+        if SHAPE_HU_WEIGHT * hu + SHAPE_CONTOUR_WEIGHT * shape < SHAPE_GATE:
+            continue
+
+        candidates.append((q, hu, shape))
+
+    if not candidates:
+        return
+
+    # SIFT is extracted at most once per dataset image
+    kp_d, des_d = sift.detectAndCompute(img_gray, None)
+    if des_d is None:
+        return
+
+    matches = stacked_knn_match(
+        [q["des"] for q, _, _ in candidates], des_d, cv2.NORM_L2, SIFT_RATIO
+    )
+
+    for (q, hu, shape), good in zip(candidates, matches):
+        sift_score = min(len(good) / SIFT_MATCH_CAP, 1.0)
+        score = fuse_scores(hu_score=hu, shape_score=shape, sift_score=sift_score)
+        if score < LOGO_SCORE_THRESHOLD:
+            continue
+        results[q["name"]].append((path, score, good, kp_d))
+
+
+# Object branch for a single dataset image.
+# One HSV histogram, one batched correlation, one ORB
+# extraction and one stacked knnMatch serve all queries.
+def _score_object_queries(img_gray, path, object_queries, hist_stack, results,
+                          pack=None):
+    db_bgr = read_bgr(path, pack)
+    if db_bgr is None:
+        return
+
+    sims = color_similarity_batch(hist_stack, compute_hsv_hist(db_bgr))
+    passing = np.flatnonzero(sims >= COLOR_SIM_THRESHOLD)
+    if len(passing) == 0:
+        return
+
+    kp_d, des_d = extract_features(img_gray, method="ORB")
+    if des_d is None:
+        return
+
+    matches = stacked_knn_match(
+        [object_queries[i]["des"] for i in passing], des_d,
+        cv2.NORM_HAMMING, RATIO_TEST
+    )
+
+    for i, good in zip(passing, matches):
+        if len(good) < MIN_MATCHES_OBJECT:
+            continue
+
+        q = object_queries[i]
+        inliers, inlier_matches, coverage = ransac_filter(
+            q["kp"], kp_d, good, q["gray"].shape
+        )
+        if inliers == 0:
+            continue
+
+        spatial = spatial_consistency(q["kp"], kp_d, inlier_matches)
+        final_score = compute_final_score(
+            inliers=inliers,
+            coverage=coverage,
+            color_score=float(sims[i]),
+            spatial=spatial
+        )
+        results[q["name"]].append((path, final_score, inlier_matches, kp_d))
+
+
+def run_batch_pipeline(queries, dataset, top_k=5, pack=None):
+    """
+    Serve a batch of queries with a single pass over the dataset.
+
+    `queries` is a list of (name, q_gray, q_bgr) tuples. Each query
+    is routed to the logo or object pipeline exactly as in main.py,
+    but dataset images are decoded and described only once per batch:
+      - object queries share one HSV histogram, a batched color
+        correlation and one stacked ORB knnMatch,
+      - logo queries share one contour extraction, a vectorized Hu
+        comparison and one stacked SIFT knnMatch.
+
+    With an ImagePack, BGR images are read from the pack.
+
+    Returns a dict mapping query name to its top-k results, in the
+    same (path, score, matches, kp_d) format as the pipelines.
+    """
+    sift = cv2.SIFT_create()
+    prepared = prepare_queries(queries, sift)
+
+    logo_queries = [q for q in prepared if q["type"] == "logo"]
+    object_queries = [q for q in prepared if q["type"] == "object"]
+    logger.info(
+        f"Batch of {len(prepared)} queries: "
+        f"{len(logo_queries)} logo, {len(object_queries)} object"
+    )
+
+    hist_stack = None
+    if object_queries:
+        hist_stack = stack_hists([q["hist"] for q in object_queries])
+
+    results = {q["name"]: [] for q in prepared}
+
+    for img_gray, path in dataset:
+        # Logo queries operate only on the logo benchmark
+        if logo_queries and "flickr_logos_27_dataset" in path:
+            _score_logo_queries(img_gray, path, logo_queries, sift, results)
+
+        if object_queries:
+            _score_object_queries(
+                img_gray, path, object_queries, hist_stack, results, pack
+            )
+
+    # --------------------------------------------------
+    # Demultiplex: rank each query's results independently.
+    # --------------------------------------------------
+    return {
+        name: sorted(res, key=lambda x: x[1], reverse=True)[:top_k]
+        for name, res in results.items()
+    }
@@ -8,14 +8,42 @@ import numpy as np
 #  - SIFT: local, scale-invariant descriptors
 #  - score fusion: aggregation of heterogeneous cues
 # --------------------------------------------------
-from .edges import extract_edges, extract_contours
-from .shape import hu_similarity, shape_similarity
+from .edges import extract_edges, extract_contours, edge_orientation_hist
+from .shape import (
+    hu_similarity, shape_similarity, SHAPE_HU_WEIGHT, SHAPE_CONTOUR_WEIGHT
+)
 from .sift_edges import sift_on_edges
 from .score_fusion import fuse_scores
-from utils.helpers import select_top_contours, best_shape_match, contour_complexity
+from .prefilter import orientation_prefilter
+from pipelines.object_pipeline.features import (
+    budget_detector, detect_with_budget, resolve_budget
+)
+from pipelines.object_pipeline.global_matching import global_ratio_match
+from pipelines.object_pipeline.geometry import wgc_filter
+from utils.helpers import (
+    select_top_contours, shape_match_details, contour_complexity,
+    contour_boxes, boxes_mask, points_in_boxes
+)
+from utils.logger import logger
 
+# --------------------------------------------------
+# Empirical thresholds of the logo pipeline:
+#  - contour complexity tolerance (polygon vertices)
+#  - shape gate applied before SIFT matching (on the
+#    shape score weighted by SHAPE_*_WEIGHT, see shape.py)
+#  - Lowe ratio and match cap for the SIFT score
+#  - final acceptance threshold on the fused score
+# --------------------------------------------------
+COMPLEXITY_TOLERANCE = 8
+SHAPE_GATE = 0.45
+SIFT_RATIO = 0.75
+SIFT_MATCH_CAP = 50.0
+LOGO_SCORE_THRESHOLD = 0.35
 
-def run_logo_pipeline(q_gray, dataset):
+
+def run_logo_pipeline(q_gray, dataset, prefilter_fraction=None, orientation_index=None,
+                      roi_margin=None, sift_budget=None, sift_selection=None,
+                      sift_db=None, wgc=False, sift_codec=None):
     """
     Execute a specialized logo retrieval pipeline.
 
@@ -28,6 +56,34 @@ def run_logo_pipeline(q_gray, dataset):
       (1) contour-based shape filtering,
       (2) SIFT-based local feature matching,
       (3) late score fusion for robustness.
+
+    With `prefilter_fraction` set, a global edge-orientation
+    prefilter first keeps only that fraction of logo images. It
+    needs the `orientation_index` of the dataset, precomputed once
+    with build_orientation_index or orientation_index_from_index.
+
+    With `roi_margin` set, SIFT on a database image is restricted
+    to the bounding boxes of its best-matching contours, enlarged
+    by that factor, instead of the whole frame.
+
+    `sift_budget` / `sift_selection` cap and spatially spread the
+    SIFT keypoints of database images (see extract_features).
+
+    With `sift_db` (a SIFT DescriptorMatrix of the logo images),
+    the query is matched once against all logo descriptors and
+    images that pass the shape gate reuse their share of the
+    matches instead of running SIFT and a matcher per image.
+    In ROI mode, matches are then restricted to keypoints inside
+    the ROI, but the ratio test has seen all descriptors of the
+    image, so it is slightly stricter than per-image ROI SIFT.
+
+    With `wgc`, only SIFT matches consistent with the dominant
+    scale change and rotation count towards the SIFT score.
+
+    With `sift_codec` (see compact.SiftCodec), SIFT descriptors of
+    the query and of database images are matched in compact form.
+    A `sift_db` built from an index with compact SIFT requires the
+    codec of that index.
     """
 
     # --------------------------------------------------
@@ -38,6 +94,23 @@ def run_logo_pipeline(q_gray, dataset):
     q_edges = extract_edges(q_gray)
     q_contours_all = extract_contours(q_edges)
 
+    # --------------------------------------------------
+    # Optional orientation prefilter.
+    # A single matmul against all logo histograms cuts the
+    # candidate set before any per-image contour or SIFT work.
+    # --------------------------------------------------
+    candidates = dataset
+    if prefilter_fraction is not None:
+        if orientation_index is None:
+            raise ValueError("prefilter_fraction requires an orientation_index")
+        q_hist = edge_orientation_hist(q_edges)
+        kept = orientation_prefilter(q_hist, orientation_index, prefilter_fraction)
+        candidates = [dataset[i] for i in kept]
+        logger.info(
+            f"Orientation prefilter kept {len(candidates)}/"
+            f"{len(orientation_index[1])} logo images"
+        )
+
     # --------------------------------------------------
     # Keep only the most salient contours.
     # This reduces noise and focuses computation on
@@ -64,6 +137,18 @@ def run_logo_pipeline(q_gray, dataset):
     if des_q is None:
         # Texture-less or extremely clean logos may fail here
         return []
+    if sift_codec is not None:
+        des_q = sift_codec.encode(des_q)
+
+    # --------------------------------------------------
+    # Optional global matching against all logo images.
+    # --------------------------------------------------
+    db_matches = None
+    if sift_db is not None:
+        _, db_matches = global_ratio_match(des_q, sift_db, ratio=SIFT_RATIO)
+
+    # Query keypoints are only needed by the WGC check
+    wgc_kp_q = kp_q if wgc else None
 
     results = []
 
@@ -72,101 +157,192 @@ def run_logo_pipeline(q_gray, dataset):
     # A dataset-level filter is applied to ensure that
     # this pipeline operates only on the logo benchmark.
     # --------------------------------------------------
-    for img_gray, path in dataset:
+    for img_gray, path in candidates:
         if "flickr_logos_27_dataset" not in path:
             # Explicit separation between logo and object datasets
             continue
 
-        # --------------------------------------------------
-        # Edge and contour extraction for the database image.
-        # --------------------------------------------------
-        edges = extract_edges(img_gray)
-        contours_all = extract_contours(edges)
-        d_contours = select_top_contours(contours_all, k=3)
-        if not d_contours:
+        candidate = shape_candidate(img_gray, q_contours, q_complexities, roi_margin)
+        if candidate is None:
             continue
 
-        # --------------------------------------------------
-        # Complexity-based contour filtering.
-        # Only contours with similar structural complexity
-        # to the query are retained.
-        #
-        # This acts as a fast, interpretable gating mechanism
-        # before more expensive shape and SIFT computations.
-        # --------------------------------------------------
-        filtered_d = []
-        for dc in d_contours:
-            dc_comp = contour_complexity(dc)
-            if any(abs(dc_comp - qc) <= 8 for qc in q_complexities):
-                filtered_d.append(dc)
-
-        if not filtered_d:
+        hu, shape, roi = candidate
+        if db_matches is not None:
+            pos = sift_db.positions.get(path)
+            if pos is None:
+                continue
+            kp_d = sift_db.keypoints(pos)
+            good = db_matches.get(pos, [])
+            if roi is not None and good:
+                inside = points_in_boxes(sift_db.kp_arrays[pos][:, :2], roi)
+                good = [m for m in good if inside[m.trainIdx]]
+            verified = fuse_sift_matches(good, kp_d, hu, shape, wgc_kp_q)
+        else:
+            verified = sift_candidate(
+                img_gray, roi, des_q, hu, shape, sift, sift_budget, sift_selection,
+                wgc_kp_q, sift_codec
+            )
+        if verified is None:
             continue
 
-        # --------------------------------------------------
-        # Shape similarity computation.
-        # The best match over all contour pairs is retained.
-        #
-        # Hu moments capture global shape similarity,
-        # while matchShapes captures contour alignment.
-        # --------------------------------------------------
-        hu, shape = best_shape_match(q_contours, filtered_d)
-        shape_score = 0.6 * hu + 0.4 * shape
-
-        # Early rejection based on shape consistency.
-        # This prevents SIFT from dominating when shape
-        # evidence is weak or misleading.
-        if shape_score < 0.45:
-            continue
+        score, good, kp_d = verified
+        results.append((path, score, good, kp_d))
 
-        # --------------------------------------------------
-        # SIFT descriptor extraction for the database image.
-        # --------------------------------------------------
-        kp_d, des_d = sift.detectAndCompute(img_gray, None)
-        if des_d is None:
-            continue
+    # --------------------------------------------------
+    # Results are ranked by descending fused score.
+    # --------------------------------------------------
+    return sorted(results, key=lambda x: x[1], reverse=True)
 
-        # --------------------------------------------------
-        # Descriptor matching using the classical Lowe
-        # ratio test to reject ambiguous correspondences.
-        # --------------------------------------------------
-        bf = cv2.BFMatcher(cv2.NORM_L2)
-        knn = bf.knnMatch(des_q, des_d, k=2)
 
-        good = []
-        for pair in knn:
-            if len(pair) < 2:
-                continue
-            m, n = pair
-            if m.distance < 0.75 * n.distance:
-                good.append(m)
-
-        # --------------------------------------------------
-        # Normalized SIFT score.
-        # The raw number of matches is capped to avoid
-        # domination by very textured images.
-        # --------------------------------------------------
-        sift_score = min(len(good) / 50.0, 1.0)
-
-        # --------------------------------------------------
-        # Late fusion of heterogeneous similarity cues.
-        # Each cue captures a different aspect of logo
-        # similarity (global shape vs local texture).
-        # --------------------------------------------------
-        score = fuse_scores(
-            hu_score=hu,
-            shape_score=shape,
-            sift_score=sift_score
-        )
+# Shape stage for one database image: contours, complexity
+# gating and shape similarity against the query contours.
+# Returns (hu, shape, roi_boxes), or None if the shape gate
+# rejects the image. roi_boxes is None unless roi_margin is set.
+def shape_candidate(img_gray, q_contours, q_complexities, roi_margin=None):
+    # --------------------------------------------------
+    # Edge and contour extraction for the database image.
+    # --------------------------------------------------
+    edges = extract_edges(img_gray)
+    contours_all = extract_contours(edges)
+    d_contours = select_top_contours(contours_all, k=3)
+
+    gated = shape_gate(q_contours, q_complexities, d_contours)
+    if gated is None:
+        return None
+
+    hu, shape, filtered_d, per_contour = gated
+
+    # --------------------------------------------------
+    # SIFT detection region for the database image.
+    # In ROI mode, only the regions around contours that
+    # passed the shape gate are described (the single best
+    # contour if none passes on its own).
+    # --------------------------------------------------
+    roi = None
+    if roi_margin is not None:
+        matched = [c for c, sc in zip(filtered_d, per_contour) if sc >= SHAPE_GATE]
+        if not matched:
+            matched = [filtered_d[int(np.argmax(per_contour))]]
+        roi = contour_boxes(matched, img_gray.shape, margin=roi_margin)
+
+    return hu, shape, roi
+
+
+# Shape gate of one database image, given its top contours:
+# complexity filtering and shape similarity against the query.
+# Returns (hu, shape, filtered_contours, per_contour_scores),
+# or None if the image is rejected.
+def shape_gate(q_contours, q_complexities, d_contours):
+    if not d_contours:
+        return None
+
+    # --------------------------------------------------
+    # Complexity-based contour filtering.
+    # Only contours with similar structural complexity
+    # to the query are retained.
+    #
+    # This acts as a fast, interpretable gating mechanism
+    # before more expensive shape and SIFT computations.
+    # --------------------------------------------------
+    filtered_d = []
+    for dc in d_contours:
+        dc_comp = contour_complexity(dc)
+        if any(abs(dc_comp - qc) <= COMPLEXITY_TOLERANCE for qc in q_complexities):
+            filtered_d.append(dc)
+
+    if not filtered_d:
+        return None
+
+    # --------------------------------------------------
+    # Shape similarity computation.
+    # The best match over all contour pairs is retained.
+    #
+    # Hu moments capture global shape similarity,
+    # while matchShapes captures contour alignment.
+    # --------------------------------------------------
+    hu, shape, per_contour = shape_match_details(
+        q_contours, filtered_d, SHAPE_HU_WEIGHT, SHAPE_CONTOUR_WEIGHT
+    )
+    shape_score = SHAPE_HU_WEIGHT * hu + SHAPE_CONTOUR_WEIGHT * shape
+
+    # Early rejection based on shape consistency.
+    # This prevents SIFT from dominating when shape
+    # evidence is weak or misleading.
+    if shape_score < SHAPE_GATE:
+        return None
+
+    return hu, shape, filtered_d, per_contour
+
+
+# SIFT stage for one database image that passed the shape gate:
+# descriptor matching, normalized SIFT score and late fusion.
+# With `roi` boxes, SIFT is only detected inside them.
+# Returns (score, good_matches, kp_d), or None if rejected.
+def sift_candidate(img_gray, roi, des_q, hu, shape, sift, budget=None, selection=None,
+                   kp_q=None, codec=None):
+    # --------------------------------------------------
+    # SIFT descriptor extraction for the database image,
+    # optionally reduced to a feature budget.
+    # --------------------------------------------------
+    mask = boxes_mask(roi, img_gray.shape) if roi is not None else None
+    budget = resolve_budget(budget, img_gray.shape)
+    if budget is not None:
+        sift = budget_detector("SIFT", budget, selection)
+    kp_d, des_d = detect_with_budget(sift, img_gray, mask, budget, selection)
+    if des_d is None:
+        return None
+    if codec is not None:
+        des_d = codec.encode(des_d)
+
+    # --------------------------------------------------
+    # Descriptor matching using the classical Lowe
+    # ratio test to reject ambiguous correspondences.
+    # --------------------------------------------------
+    bf = cv2.BFMatcher(cv2.NORM_L2)
+    knn = bf.knnMatch(des_q, des_d, k=2)
 
-        # Final acceptance threshold.
-        # Empirically tuned to balance recall and precision.
-        if score < 0.35:
+    good = []
+    for pair in knn:
+        if len(pair) < 2:
             continue
+        m, n = pair
+        if m.distance < SIFT_RATIO * n.distance:
+            good.append(m)
 
-        results.append((path, score, good, kp_d))
+    return fuse_sift_matches(good, kp_d, hu, shape, kp_q)
+
+
+# Scoring of the SIFT matches of one database image:
+# normalized SIFT score, late fusion and acceptance threshold.
+# With query keypoints given, matches are first reduced to the
+# geometrically consistent ones (WGC).
+# Returns (score, good_matches, kp_d), or None if rejected.
+def fuse_sift_matches(good, kp_d, hu, shape, kp_q=None):
+    if kp_q is not None:
+        good = wgc_filter(kp_q, kp_d, good)
 
     # --------------------------------------------------
-    # Results are ranked by descending fused score.
+    # Normalized SIFT score.
+    # The raw number of matches is capped to avoid
+    # domination by very textured images.
     # --------------------------------------------------
-    return sorted(results, key=lambda x: x[1], reverse=True)
+    sift_score = min(len(good) / SIFT_MATCH_CAP, 1.0)
+
+    # --------------------------------------------------
+    # Late fusion of heterogeneous similarity cues.
+    # Each cue captures a different aspect of logo
+    # similarity (global shape vs local texture).
+    # --------------------------------------------------
+    score = fuse_scores(
+        hu_score=hu,
+        shape_score=shape,
+        sift_score=sift_score
+    )
+
+    # Final acceptance threshold.
+    # Empirically tuned to balance recall and precision.
+    if score < LOGO_SCORE_THRESHOLD:
+        return None
+
+    return score, good, kp_d
+
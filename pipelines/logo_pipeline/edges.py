@@ -8,11 +8,16 @@ def edge_orientation_hist(edges, bins=16):
     gy = cv2.Sobel(edges, cv2.CV_32F, 0, 1)
 
     angle = cv2.phase(gx, gy, angleInDegrees=True)
-    hist = np.histogram(angle, bins=bins, range=(0, 360))[0]
 
-    # Normalization for scale invariance
-    hist = hist / (hist.sum() + 1e-6)
-    return hist
+    # Only pixels with a gradient carry orientation;
+    # flat regions would otherwise all fall into bin 0
+    mag = np.abs(gx) + np.abs(gy)
+    hist = np.histogram(angle[mag > 0], bins=bins, range=(0, 360))[0]
+
+    # L2 normalization: the dot product becomes a cosine
+    # similarity in [0, 1], independent of image size
+    hist = hist / (np.linalg.norm(hist) + 1e-6)
+    return hist.astype(np.float32)
 
 
 # Simple similarity between two orientation histograms.
@@ -0,0 +1,79 @@
+import numpy as np
+
+from .edges import extract_edges, edge_orientation_hist
+from utils.index_store import iter_index
+
+# Number of orientation bins of the global edge descriptor
+ORIENTATION_BINS = 16
+
+
+# Precompute the orientation histograms of all logo images.
+# Each histogram becomes one row of a (n_images, bins) matrix;
+# `rows` maps matrix rows back to dataset positions.
+def build_orientation_index(dataset, bins=ORIENTATION_BINS):
+    rows, hists = [], []
+
+    for i, (img_gray, path) in enumerate(dataset):
+        if "flickr_logos_27_dataset" not in path:
+            continue
+        rows.append(i)
+        hists.append(edge_orientation_hist(extract_edges(img_gray), bins=bins))
+
+    matrix = np.stack(hists) if hists else np.zeros((0, bins), np.float32)
+    return matrix, np.asarray(rows, dtype=np.int64)
+
+
+# Same index, read from the histograms stored by the offline
+# index (index.py build) instead of recomputing them. Images of
+# `dataset` missing from the index are left out of the prefilter.
+def orientation_index_from_index(index_dir, dataset):
+    positions = {path: i for i, (_, path) in enumerate(dataset)}
+
+    rows, hists = [], []
+    for rec in iter_index(index_dir):
+        pos = positions.get(rec["path"])
+        if pos is None or "flickr_logos_27_dataset" not in rec["path"]:
+            continue
+        rows.append(pos)
+        hists.append(rec["orientation"])
+
+    order = np.argsort(rows, kind="stable")
+    matrix = (
+        np.stack(hists)[order].astype(np.float32)
+        if hists else np.zeros((0, ORIENTATION_BINS), np.float32)
+    )
+    return matrix, np.asarray(rows, dtype=np.int64)[order]
+
+
+# Score the query against every indexed image with one matmul
+# and keep the best `keep_fraction` of them (at least one).
+# Returns the kept dataset positions in dataset order.
+def orientation_prefilter(q_hist, index, keep_fraction):
+    matrix, rows = index
+    if len(rows) == 0:
+        return rows
+
+    scores = matrix @ q_hist
+    keep = max(1, int(np.ceil(keep_fraction * len(rows))))
+    if keep >= len(rows):
+        return rows
+
+    top = np.argpartition(-scores, keep - 1)[:keep]
+    return np.sort(rows[top])
+
+
+# Recall of a prefilter against full-pipeline results.
+# Since the pipeline scores every image independently, the
+# prefiltered ranking is exactly the full ranking restricted to
+# the kept candidates, so recall needs only one full run.
+def prefilter_recall(full_results, kept_paths, top_k=5):
+    kept = set(kept_paths)
+    ranked = [r[0] for r in full_results]
+
+    def recall(paths):
+        return sum(p in kept for p in paths) / len(paths) if paths else 1.0
+
+    return {
+        f"recall@{top_k}": recall(ranked[:top_k]),
+        "recall@all": recall(ranked),
+    }
@@ -0,0 +1,99 @@
+import cv2
+import numpy as np
+
+# --------------------------------------------------
+# Logo retrieval over a region index (index.py build
+# --regions). Shape gating and SIFT matching run on the
+# contours and descriptors stored per annotated logo box,
+# so no dataset image is decoded or described per query,
+# and every region carries the class label of its box.
+# --------------------------------------------------
+from . import SIFT_RATIO, shape_gate, fuse_sift_matches
+from .edges import extract_edges, extract_contours
+from pipelines.object_pipeline.matching import ratio_test
+from utils.helpers import select_top_contours, contour_complexity
+from utils.index_store import iter_index, array_to_keypoints
+from utils.logger import logger
+
+
+# Load all region records of a region index.
+def load_region_index(index_dir):
+    regions = list(iter_index(index_dir, regions=True))
+    logger.info(
+        f"Region index: {len(regions)} regions, "
+        f"{sum(1 for r in regions if r['label'])} labeled"
+    )
+    return regions
+
+
+# Rebuild the contour list of a stored record.
+def record_contours(rec):
+    if len(rec["contour_lengths"]) == 0:
+        return []
+
+    bounds = np.cumsum(rec["contour_lengths"])[:-1]
+    return [c.reshape(-1, 1, 2) for c in np.split(rec["contour_points"], bounds)]
+
+
+# Class labels present in a region index.
+def region_labels(regions):
+    return sorted({r["label"] for r in regions if r["label"]})
+
+
+def run_logo_region_pipeline(q_gray, regions, label=None, wgc=False, sift_codec=None):
+    """
+    Logo retrieval against precomputed regions.
+
+    Each region goes through the same shape gate, SIFT ratio test
+    and score fusion as run_logo_pipeline, using only the contours
+    and descriptors of its box. An image is ranked by its best
+    region. With `label`, only regions annotated with that class
+    are searched (unannotated whole-image regions are skipped).
+    An index built with compact SIFT needs its codec (`sift_codec`).
+
+    Returns (path, score, good_matches, kp_d) tuples ranked by
+    descending fused score.
+    """
+    if label is not None:
+        labels = {l.lower(): l for l in region_labels(regions)}
+        if label.lower() not in labels:
+            logger.warning(f"Unknown logo label: {label}")
+            return []
+        label = labels[label.lower()]
+        regions = [r for r in regions if r["label"] == label]
+
+    q_contours = select_top_contours(extract_contours(extract_edges(q_gray)), k=3)
+    if not q_contours:
+        return []
+    q_complexities = [contour_complexity(c) for c in q_contours]
+
+    kp_q, des_q = cv2.SIFT_create().detectAndCompute(q_gray, None)
+    if des_q is None:
+        return []
+    if sift_codec is not None:
+        des_q = sift_codec.encode(des_q)
+
+    bf = cv2.BFMatcher(cv2.NORM_L2)
+    best = {}
+
+    for rec in regions:
+        gated = shape_gate(q_contours, q_complexities, record_contours(rec))
+        if gated is None or len(rec["sift_des"]) == 0:
+            continue
+
+        hu, shape, _, _ = gated
+        good = ratio_test(bf.knnMatch(des_q, rec["sift_des"], k=2), SIFT_RATIO)
+        verified = fuse_sift_matches(
+            good, array_to_keypoints(rec["sift_kp"]), hu, shape,
+            kp_q if wgc else None
+        )
+        if verified is None:
+            continue
+
+        # One result per image: its best-scoring region
+        score, good, kp_d = verified
+        path = rec["path"]
+        if path not in best or score > best[path][1]:
+            best[path] = (path, score, good, kp_d)
+
+    return sorted(best.values(), key=lambda x: x[1], reverse=True)
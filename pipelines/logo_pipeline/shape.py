@@ -1,16 +1,23 @@
 import cv2
 import numpy as np
 
+# Weights of the fused shape score (Hu moments vs contour
+# matching), compared against the logo pipeline's SHAPE_GATE
+SHAPE_HU_WEIGHT = 0.6
+SHAPE_CONTOUR_WEIGHT = 0.4
 
-# Hu-moment based shape similarity.
+
+# Log-scaled Hu moment vector of a contour.
 # Log transform is applied to stabilize dynamic range.
-def hu_similarity(cnt1, cnt2):
-    hu1 = cv2.HuMoments(cv2.moments(cnt1)).flatten()
-    hu2 = cv2.HuMoments(cv2.moments(cnt2)).flatten()
+def hu_vector(cnt):
+    hu = cv2.HuMoments(cv2.moments(cnt)).flatten()
+    return -np.sign(hu) * np.log10(np.abs(hu) + 1e-12)
 
-    # Log scaling for numerical stability
-    hu1 = -np.sign(hu1) * np.log10(np.abs(hu1) + 1e-12)
-    hu2 = -np.sign(hu2) * np.log10(np.abs(hu2) + 1e-12)
+
+# Hu-moment based shape similarity.
+def hu_similarity(cnt1, cnt2):
+    hu1 = hu_vector(cnt1)
+    hu2 = hu_vector(cnt2)
 
     dist = np.linalg.norm(hu1 - hu2)
 
@@ -18,6 +25,13 @@ def hu_similarity(cnt1, cnt2):
     return np.exp(-dist)
 
 
+# Pairwise Hu similarity between two stacks of Hu vectors.
+# Returns an (n1, n2) matrix, one entry per contour pair.
+def hu_similarity_matrix(hu1, hu2):
+    dist = np.linalg.norm(hu1[:, None, :] - hu2[None, :, :], axis=2)
+    return np.exp(-dist)
+
+
 # Contour similarity using OpenCV shape matching.
 # Lower distance indicates better alignment.
 def shape_similarity(cnt1, cnt2):
@@ -0,0 +1,199 @@
+import cv2
+import numpy as np
+
+# --------------------------------------------------
+# Object pipeline stages:
+#  - color: global color-based pre-filtering
+#  - features: local feature extraction
+#  - matching: descriptor-level matching
+#  - geometry: geometric verification (RANSAC)
+#  - scoring: fusion of heterogeneous similarity cues
+# --------------------------------------------------
+from .color import color_prefilter
+from .features import extract_features
+from .matching import ratio_test_match
+from .global_matching import global_ratio_match
+from .geometry import ransac_filter, wgc_filter
+from .scoring import compute_final_score, spatial_consistency
+from utils.logger import logger
+
+# --------------------------------------------------
+# Minimum number of matches required for the object
+# pipeline. This empirical threshold prevents:
+#  - unstable homography estimation
+#  - accidental matches due to noise
+# --------------------------------------------------
+MIN_MATCHES_OBJECT = 10
+
+
+def run_object_pipeline(q_gray, q_bgr, kp_q, des_q, dataset, budget=None, selection=None,
+                        pack=None, wgc=False):
+    """
+    Execute the object retrieval pipeline.
+
+    Each dataset image goes through:
+      (1) color-based pre-filtering,
+      (2) ORB matching with Lowe's ratio test,
+      (3) RANSAC geometric verification,
+      (4) spatial consistency and score fusion.
+
+    `budget` / `selection` set the ORB feature budget policy of
+    dataset images (see extract_features). With an ImagePack,
+    BGR images are read from the pack instead of decoded.
+    With `wgc`, matches go through a weak geometric consistency
+    check before RANSAC (see verify_matches).
+
+    Returns (path, score, inlier_matches, kp_d) tuples
+    ranked by descending final score.
+    """
+    results = []
+
+    for img_gray, path in dataset:
+        # BGR image is required only for color pre-filtering
+        db_bgr = read_bgr(path, pack)
+        if db_bgr is None:
+            continue
+
+        # --------------------------------------------------
+        # Color-based pre-filtering:
+        # Significantly reduces the search space before
+        # expensive geometric verification.
+        # --------------------------------------------------
+        passed, color_score = color_prefilter(q_bgr, db_bgr)
+        if not passed:
+            continue
+
+        # Matching, RANSAC and score fusion
+        kp_d, des_d = extract_features(
+            img_gray, method="ORB", budget=budget, selection=selection
+        )
+        verified = verify_candidate(
+            kp_q, des_q, q_gray.shape, kp_d, des_d, color_score, wgc
+        )
+        if verified is None:
+            continue
+
+        final_score, inlier_matches = verified
+        results.append(
+            (path, final_score, inlier_matches, kp_d)
+        )
+
+    # Sort results by descending final score
+    return sorted(results, key=lambda x: x[1], reverse=True)
+
+
+def run_object_pipeline_global(q_gray, q_bgr, kp_q, des_q, db, pack=None, wgc=False):
+    """
+    Object retrieval with global descriptor matching.
+
+    The query is matched once against `db`, a DescriptorMatrix
+    of the whole dataset (see global_matching). Images are then
+    visited in descending vote order; only those with enough
+    votes go through the color pre-filter and RANSAC, reusing
+    the matches found by the global search.
+
+    Returns the same (path, score, inlier_matches, kp_d) tuples
+    as run_object_pipeline.
+    """
+    votes, matches = global_ratio_match(des_q, db)
+
+    candidates = np.flatnonzero(votes >= MIN_MATCHES_OBJECT)
+    candidates = candidates[np.argsort(-votes[candidates], kind="stable")]
+    logger.info(
+        f"Global matching: {int(votes.sum())} matches, "
+        f"{len(candidates)}/{len(db)} images with enough votes"
+    )
+
+    results = []
+    for i in candidates:
+        path = db.paths[i]
+        db_bgr = read_bgr(path, pack)
+        if db_bgr is None:
+            continue
+
+        passed, color_score = color_prefilter(q_bgr, db_bgr)
+        if not passed:
+            continue
+
+        kp_d = db.keypoints(i)
+        verified = verify_matches(
+            kp_q, q_gray.shape, kp_d, matches[i], color_score, wgc
+        )
+        if verified is None:
+            continue
+
+        final_score, inlier_matches = verified
+        results.append(
+            (path, final_score, inlier_matches, kp_d)
+        )
+
+    return sorted(results, key=lambda x: x[1], reverse=True)
+
+
+# BGR dataset image, from the image pack when one is given.
+def read_bgr(path, pack=None):
+    if pack is not None:
+        return pack.read_bgr(path)
+    return cv2.imread(path)
+
+
+# Matching, geometric verification and scoring of one candidate
+# that passed the color pre-filter.
+# Returns (final_score, inlier_matches), or None if rejected.
+def verify_candidate(kp_q, des_q, q_shape, kp_d, des_d, color_score, wgc=False):
+    # --------------------------------------------------
+    # Local descriptor matching
+    # --------------------------------------------------
+    matches = ratio_test_match(des_q, des_d)
+    return verify_matches(kp_q, q_shape, kp_d, matches, color_score, wgc)
+
+
+# Geometric verification and scoring of ready-made matches.
+# Returns (final_score, inlier_matches), or None if rejected.
+def verify_matches(kp_q, q_shape, kp_d, matches, color_score, wgc=False):
+    if len(matches) < MIN_MATCHES_OBJECT:
+        return None
+
+    # --------------------------------------------------
+    # Weak geometric consistency (optional):
+    # only matches agreeing on the dominant scale change
+    # and rotation are kept; candidates without a strong
+    # peak are rejected before RANSAC.
+    # --------------------------------------------------
+    if wgc:
+        matches = wgc_filter(kp_q, kp_d, matches)
+        if len(matches) < MIN_MATCHES_OBJECT:
+            return None
+
+    # --------------------------------------------------
+    # Geometric verification:
+    # RANSAC-based homography estimation combined with
+    # inlier counting and spatial coverage estimation.
+    # --------------------------------------------------
+    inliers, inlier_matches, coverage = ransac_filter(
+        kp_q, kp_d, matches, q_shape
+    )
+
+    if inliers == 0:
+        return None
+
+    # --------------------------------------------------
+    # Spatial consistency:
+    # Additional structural coherence check that
+    # complements pure inlier counting.
+    # --------------------------------------------------
+    spatial = spatial_consistency(kp_q, kp_d, inlier_matches)
+
+    # --------------------------------------------------
+    # Score fusion:
+    # The final similarity score aggregates multiple
+    # independent cues into a single scalar value.
+    # --------------------------------------------------
+    final_score = compute_final_score(
+        inliers=inliers,
+        coverage=coverage,
+        color_score=color_score,
+        spatial=spatial
+    )
+
+    return final_score, inlier_matches
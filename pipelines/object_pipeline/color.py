@@ -32,6 +32,35 @@ def color_similarity(hist_q, hist_d):
     return cv2.compareHist(hist_q, hist_d, cv2.HISTCMP_CORREL)
 
 
+# Stack query histograms for batched correlation.
+# Returns the flattened rows together with the per-row
+# sums needed by the HISTCMP_CORREL formula.
+def stack_hists(hists):
+    flat = np.stack([h.ravel() for h in hists]).astype(np.float64)
+    return flat, flat.sum(axis=1), (flat * flat).sum(axis=1)
+
+
+# Correlation of one histogram against many stacked histograms.
+# Same formula as HISTCMP_CORREL, evaluated with a single matvec.
+def color_similarity_batch(stacked_q, hist_d):
+    flat_q, s1, s11 = stacked_q
+    d = hist_d.ravel().astype(np.float64)
+    s2, s22 = d.sum(), d @ d
+    s12 = flat_q @ d
+
+    # cv2.compareHist iterates n-D histograms plane by plane
+    # and normalizes by the plane size, not the total size.
+    plane = hist_d.size // hist_d.shape[0] if hist_d.ndim > 2 else hist_d.size
+    scale = 1.0 / plane
+
+    num = s12 - s1 * s2 * scale
+    den = (s11 - s1 * s1 * scale) * (s22 - s2 * s2 * scale)
+
+    # OpenCV reports perfect correlation for flat histograms
+    safe = np.where(np.abs(den) > 1e-12, den, 1.0)
+    return np.where(np.abs(den) > 1e-12, num / np.sqrt(np.abs(safe)), 1.0)
+
+
 # Fast color-based pre-filter.
 # Reduces the search space before expensive feature matching.
 def color_prefilter(img_q_bgr, img_d_bgr):
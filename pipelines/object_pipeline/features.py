@@ -1,12 +1,130 @@
 import cv2
-
-ORB_NFEATURES = 1500
-import cv2
+import numpy as np
 
 # Default number of ORB features.
 # Chosen as a trade-off between coverage and speed.
 ORB_NFEATURES = 1500
 
+# --------------------------------------------------
+# Feature budget policy.
+#  - "area" budgets scale linearly with image area,
+#    relative to a VGA-sized reference image, so the
+#    keypoint density stays constant
+#  - spatial selection detects BUDGET_OVERSAMPLE times
+#    the budget, then keeps a well-spread subset
+# --------------------------------------------------
+BUDGET_REF_AREA = 640 * 480
+BUDGET_MIN = 200
+BUDGET_MAX = 4000
+BUDGET_OVERSAMPLE = 3
+
+# Grid used by grid-bucketed selection (cells per side)
+GRID_CELLS = 8
+
+# ANMS robustness: a neighbour suppresses a keypoint only if
+# it is clearly stronger (response * ANMS_ROBUST > own response)
+ANMS_ROBUST = 0.9
+
+
+# Resolve a budget specification for a given image.
+# None keeps the detector default, an int is a fixed budget,
+# "area" scales ORB_NFEATURES with the image area.
+def resolve_budget(budget, img_shape):
+    if budget != "area":
+        return budget
+
+    area = img_shape[0] * img_shape[1]
+    scaled = int(ORB_NFEATURES * area / BUDGET_REF_AREA)
+    return int(np.clip(scaled, BUDGET_MIN, BUDGET_MAX))
+
+
+# Grid-bucketed selection: keypoints are taken round-robin over
+# grid cells, strongest first within each cell, so that sparse
+# regions keep their best keypoints even next to dense texture.
+def select_grid(kps, budget, img_shape, cells=GRID_CELLS):
+    h, w = img_shape[:2]
+    pts = np.float32([k.pt for k in kps])
+    resp = np.float32([k.response for k in kps])
+
+    cx = np.minimum((pts[:, 0] * cells / w).astype(np.int64), cells - 1)
+    cy = np.minimum((pts[:, 1] * cells / h).astype(np.int64), cells - 1)
+    cell = cy * cells + cx
+
+    # Rank of each keypoint inside its cell (0 = strongest)
+    order = np.lexsort((-resp, cell))
+    sorted_cells = cell[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_cells, sorted_cells)
+
+    # Round-robin: all rank-0 keypoints first, then rank-1, ...
+    pick = order[np.lexsort((-resp[order], rank))][:budget]
+    return [kps[i] for i in pick]
+
+
+# Adaptive non-maximal suppression: each keypoint gets the radius
+# to its nearest clearly stronger neighbour; the largest radii
+# are kept. Keypoints are sorted by response, so the candidates
+# of a block of rows are a prefix of the sorted arrays; distances
+# are computed block by block to bound memory.
+def select_anms(kps, budget, robust=ANMS_ROBUST, block=512):
+    resp = np.float32([k.response for k in kps])
+    order = np.argsort(-resp, kind="stable")
+    x = np.float32([kps[i].pt[0] for i in order])
+    y = np.float32([kps[i].pt[1] for i in order])
+    r = resp[order]
+
+    # Number of keypoints clearly stronger than each one
+    n_stronger = np.searchsorted(-robust * r, -r)
+
+    radii = np.full(len(kps), np.inf, dtype=np.float32)
+    for start in range(0, len(kps), block):
+        stop = min(start + block, len(kps))
+        limit = n_stronger[stop - 1]
+        if limit == 0:
+            continue
+        d2 = (x[start:stop, None] - x[None, :limit]) ** 2
+        d2 += (y[start:stop, None] - y[None, :limit]) ** 2
+        d2[np.arange(limit)[None, :] >= n_stronger[start:stop, None]] = np.inf
+        radii[order[start:stop]] = d2.min(axis=1)
+
+    # Ties (e.g. several unsuppressed maxima) fall back to response
+    pick = np.lexsort((-resp, -radii))[:budget]
+    return [kps[i] for i in pick]
+
+
+# Keep at most `budget` keypoints using the given strategy.
+def select_keypoints(kps, budget, img_shape, selection="grid"):
+    kps = list(kps)
+    if len(kps) <= budget:
+        return kps
+
+    if selection == "anms":
+        return select_anms(kps, budget)
+    if selection == "grid":
+        return select_grid(kps, budget, img_shape)
+
+    # Plain strongest-first selection
+    return sorted(kps, key=lambda k: k.response, reverse=True)[:budget]
+
+
+# Detector capped for a resolved budget: spatial selection
+# detects BUDGET_OVERSAMPLE times the budget to choose from.
+def budget_detector(method, budget, selection=None):
+    nfeatures = budget if selection is None else budget * BUDGET_OVERSAMPLE
+    if method == "SIFT":
+        return cv2.SIFT_create(nfeatures=nfeatures)
+    return cv2.ORB_create(nfeatures=nfeatures)
+
+
+# Detect, reduce to the budget, then describe only what is kept.
+def detect_with_budget(detector, image, mask, budget, selection):
+    if budget is None:
+        return detector.detectAndCompute(image, mask)
+
+    kps = select_keypoints(detector.detect(image, mask), budget, image.shape, selection)
+    if not kps:
+        return (), None
+    return detector.compute(image, kps)
+
 
 # ORB feature extraction wrapper.
 def extract_orb(image, mask=None):
@@ -23,10 +141,19 @@ def extract_sift(image, mask=None):
 # Unified feature extraction interface.
 # Allows switching between ORB and SIFT without
 # changing downstream pipeline code.
-def extract_features(image, mask=None, method="ORB"):
-    if method == "SIFT":
-        sift = cv2.SIFT_create()
-        return sift.detectAndCompute(image, mask)
-    else:
-        orb = cv2.ORB_create(nfeatures=1500)
-        return orb.detectAndCompute(image, mask)
+#
+# `budget` (None, int or "area") caps the number of features;
+# `selection` ("grid" or "anms") spreads the kept keypoints
+# over the image instead of taking the strongest ones.
+def extract_features(image, mask=None, method="ORB", budget=None, selection=None):
+    budget = resolve_budget(budget, image.shape)
+
+    if budget is None:
+        if method == "SIFT":
+            return extract_sift(image, mask)
+        return extract_orb(image, mask)
+
+    detector = budget_detector(method, budget, selection)
+    if selection is None:
+        return detector.detectAndCompute(image, mask)
+    return detect_with_budget(detector, image, mask, budget, selection)
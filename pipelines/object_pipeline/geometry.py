@@ -11,6 +11,18 @@ MIN_MATCHES = 10
 # Minimum number of inliers required to estimate spatial coverage
 MIN_HULL_POINTS = 3
 
+# --------------------------------------------------
+# Weak geometric consistency (WGC) histogram:
+#  - log2 scale ratio in half-octave bins, clipped to
+#    +/- WGC_SCALE_RANGE octaves
+#  - orientation difference in WGC_ANGLE_BINS bins
+# The dominant bin is taken with its direct neighbours,
+# so a consistent transform split by a bin edge is kept.
+# --------------------------------------------------
+WGC_SCALE_RANGE = 4.0
+WGC_SCALE_STEP = 0.5
+WGC_ANGLE_BINS = 16
+
 
 # RANSAC-based geometric verification.
 # Filters matches using homography consistency and estimates spatial coverage.
@@ -51,6 +63,43 @@ def ransac_filter(kp_q, kp_d, matches, query_shape):
     return inliers, inlier_matches, coverage
 
 
+# Weak geometric consistency check.
+# Matches of a true correspondence share one scale change and
+# one rotation; keeps only the matches of the dominant
+# (scale ratio, angle difference) bin. Much cheaper than RANSAC.
+def wgc_filter(kp_q, kp_d, matches):
+    if not matches:
+        return []
+
+    geom_q = np.float32([(kp_q[m.queryIdx].size, kp_q[m.queryIdx].angle) for m in matches])
+    geom_d = np.float32([(kp_d[m.trainIdx].size, kp_d[m.trainIdx].angle) for m in matches])
+
+    n_scale = int(2 * WGC_SCALE_RANGE / WGC_SCALE_STEP)
+    log_scale = np.clip(
+        np.log2(geom_d[:, 0] / geom_q[:, 0]), -WGC_SCALE_RANGE, WGC_SCALE_RANGE - 1e-6
+    )
+    s_bin = ((log_scale + WGC_SCALE_RANGE) / WGC_SCALE_STEP).astype(np.int64)
+
+    d_angle = np.mod(geom_d[:, 1] - geom_q[:, 1], 360.0)
+    a_bin = (d_angle * WGC_ANGLE_BINS / 360.0).astype(np.int64) % WGC_ANGLE_BINS
+
+    hist = np.bincount(
+        s_bin * WGC_ANGLE_BINS + a_bin, minlength=n_scale * WGC_ANGLE_BINS
+    ).reshape(n_scale, WGC_ANGLE_BINS)
+
+    # 3x3 box sum: circular in angle, zero-padded in scale
+    votes = hist + np.roll(hist, 1, axis=1) + np.roll(hist, -1, axis=1)
+    padded = np.pad(votes, ((1, 1), (0, 0)))
+    votes = padded[:-2] + padded[1:-1] + padded[2:]
+
+    s0, a0 = np.unravel_index(np.argmax(votes), votes.shape)
+    a_dist = np.abs(a_bin - a0)
+    a_dist = np.minimum(a_dist, WGC_ANGLE_BINS - a_dist)
+    keep = (np.abs(s_bin - s0) <= 1) & (a_dist <= 1)
+
+    return [m for m, k in zip(matches, keep) if k]
+
+
 # Measure spatial compactness of inlier matches.
 # Useful as an additional structural consistency cue.
 def shape_compactness(kp_d, inlier_matches):
@@ -0,0 +1,236 @@
+import numpy as np
+import cv2
+
+# --------------------------------------------------
+# Global descriptor matching.
+# All dataset descriptors are stacked into a single
+# matrix with an image-id array, so a query is matched
+# against the whole database in a few large blocked
+# NumPy calls instead of one BFMatcher call per image:
+#  - ORB: Hamming distance from popcounts and a matrix
+#    product of the unpacked bits
+#  - SIFT: L2 distance via matrix products
+# Nearest neighbours are then reduced per image, so the
+# ratio test and the resulting votes are the same as with
+# per-image matching. Surviving matches are handed to
+# geometric verification as they are.
+# --------------------------------------------------
+from .features import extract_features
+from .matching import RATIO_TEST
+from utils.index_store import keypoints_to_array, array_to_keypoints, iter_index
+
+# Upper bound on the elements of one distance block
+# (query descriptors x database rows)
+BLOCK_ELEMS = 1 << 22
+
+# Columns of one ORB block: keeps the Hamming keys of
+# _nearest_hamming exact in float32
+MAX_KEY_COLS = 1 << 14
+
+# Set bits of every byte value (np.bitwise_count needs NumPy 2)
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+class DescriptorMatrix:
+    """
+    Descriptors of a whole dataset in one matrix.
+
+    Rows of image i are matrix[offsets[i]:offsets[i + 1]];
+    image_ids maps every row back to its image. Keypoints are
+    kept as arrays and rebuilt only for images that are verified.
+    """
+
+    def __init__(self, paths, kp_arrays, descriptors, method="ORB"):
+        self.method = method
+        self.paths = list(paths)
+        self.kp_arrays = list(kp_arrays)
+        self.positions = {p: i for i, p in enumerate(self.paths)}
+
+        counts = np.array([len(d) for d in descriptors], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.image_ids = np.repeat(np.arange(len(counts)), counts)
+
+        if method == "SIFT":
+            # Compact (uint8) SIFT codes are kept as they are
+            matrix = (
+                np.vstack(descriptors)
+                if counts.sum() else np.zeros((0, 128), np.float32)
+            )
+            self.matrix = matrix if matrix.dtype == np.uint8 else matrix.astype(np.float32)
+            self.sq_norms = (self.matrix.astype(np.float32) ** 2).sum(axis=1)
+        else:
+            self.matrix = (
+                np.vstack(descriptors)
+                if counts.sum() else np.zeros((0, 32), np.uint8)
+            )
+            self.popcounts = POPCOUNT[self.matrix].sum(axis=1).astype(np.float32)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def keypoints(self, i):
+        return array_to_keypoints(self.kp_arrays[i])
+
+    def nbytes(self):
+        return self.matrix.nbytes + self.image_ids.nbytes
+
+
+# Build a descriptor matrix by extracting features of a
+# preloaded dataset of (gray, path) pairs. SIFT descriptors
+# are stored in compact form when a SiftCodec is given.
+def descriptor_matrix_from_dataset(dataset, method="ORB", budget=None, selection=None,
+                                   sift_codec=None):
+    paths, kp_arrays, descriptors = [], [], []
+    for img_gray, path in dataset:
+        kp, des = extract_features(img_gray, method=method, budget=budget, selection=selection)
+        if des is None:
+            continue
+        if method == "SIFT" and sift_codec is not None:
+            des = sift_codec.encode(des)
+        paths.append(path)
+        kp_arrays.append(keypoints_to_array(kp))
+        descriptors.append(des)
+
+    return DescriptorMatrix(paths, kp_arrays, descriptors, method)
+
+
+# Build a descriptor matrix from an offline index (index.py),
+# without touching the images. `path_filter` selects images.
+def descriptor_matrix_from_index(index_dir, method="ORB", path_filter=None):
+    prefix = "sift" if method == "SIFT" else "orb"
+
+    paths, kp_arrays, descriptors = [], [], []
+    for rec in iter_index(index_dir):
+        if path_filter is not None and not path_filter(rec["path"]):
+            continue
+        if len(rec[f"{prefix}_des"]) == 0:
+            continue
+        paths.append(rec["path"])
+        kp_arrays.append(rec[f"{prefix}_kp"])
+        descriptors.append(rec[f"{prefix}_des"])
+
+    return DescriptorMatrix(paths, kp_arrays, descriptors, method)
+
+
+# Consecutive image ranges whose descriptors fit in one block.
+# An image larger than the block gets a block of its own.
+def _image_blocks(offsets, max_rows):
+    n_images = len(offsets) - 1
+    start = 0
+    while start < n_images:
+        stop = np.searchsorted(offsets, offsets[start] + max_rows, side="right") - 1
+        stop = min(max(stop, start + 1), n_images)
+        yield start, stop
+        start = stop
+
+
+# Augmented query for the Hamming keys of _nearest_hamming:
+# [-2 * bits, popcount, 1], one row per query descriptor.
+def _hamming_query(des_q):
+    bits = np.unpackbits(des_q, axis=1).astype(np.float32)
+    return np.hstack([-2.0 * bits, bits.sum(axis=1, keepdims=True), np.ones((len(bits), 1), np.float32)])
+
+
+# Nearest and second nearest neighbour per (query descriptor,
+# image) for ORB. Hamming distances are integers, so
+#   key = n_cols * dist + col
+# encodes the distance and the column in one value, and a single
+# reduction yields both the nearest distance and its (first)
+# column. The keys come out of one matrix product of the
+# augmented query and [n_cols * bits, n_cols, n_cols * popcount + col].
+def _nearest_hamming(q, db, r0, r1, starts):
+    n_cols = r1 - r0
+    # Partial sums stay below 2^24 (exact in float32) up to
+    # MAX_KEY_COLS columns; larger single-image blocks use float64
+    dtype = np.float32 if n_cols <= MAX_KEY_COLS else np.float64
+
+    rows = np.empty((n_cols, q.shape[1]), dtype)
+    rows[:, :-2] = np.unpackbits(db.matrix[r0:r1], axis=1)
+    rows[:, :-2] *= n_cols
+    rows[:, -2] = n_cols
+    rows[:, -1] = n_cols * db.popcounts[r0:r1] + np.arange(n_cols)
+    keys = q.astype(dtype, copy=False) @ rows.T
+
+    k1 = np.minimum.reduceat(keys, starts, axis=1)
+    d1, first = np.divmod(k1.astype(np.int64), n_cols)
+
+    # Second nearest: the minimum once the nearest is masked
+    # (a tied distance is then its own runner-up)
+    keys[np.arange(len(keys))[:, None], first] = np.inf
+    k2 = np.minimum.reduceat(keys, starts, axis=1)
+    d2 = np.where(np.isfinite(k2), k2 // n_cols, np.inf)
+
+    return d1.astype(np.float32), first - starts, d2
+
+
+# Same for SIFT, on squared L2 distances
+#   ||q - d||^2 = ||q||^2 + ||d||^2 - 2 q.d
+# which are not integers, so the nearest column is located by
+# comparing against the per-image minimum.
+def _nearest_l2(q, q_sq, db, r0, r1, starts, counts):
+    rows = db.matrix[r0:r1].astype(np.float32, copy=False)
+    dist = q @ rows.T
+    dist *= -2.0
+    dist += q_sq[:, None]
+    dist += db.sq_norms[None, r0:r1]
+
+    d1 = np.minimum.reduceat(dist, starts, axis=1)
+    cols = np.where(dist == np.repeat(d1, counts, axis=1), np.arange(r1 - r0), r1 - r0)
+    first = np.minimum.reduceat(cols, starts, axis=1)
+
+    dist[np.arange(len(dist))[:, None], first] = np.inf
+    d2 = np.minimum.reduceat(dist, starts, axis=1)
+
+    return (
+        np.sqrt(np.maximum(d1, 0.0)), first - starts, np.sqrt(np.maximum(d2, 0.0))
+    )
+
+
+def global_ratio_match(des_q, db, ratio=RATIO_TEST):
+    """
+    Match query descriptors against the whole database at once.
+
+    Distances to all dataset descriptors are computed in blocks of
+    whole images; per image, the nearest and second nearest
+    neighbours of every query descriptor are found with segmented
+    reductions and Lowe's ratio test is applied. Surviving matches
+    are therefore those of per-image knnMatch + ratio test.
+
+    Returns (votes, matches): votes[i] is the number of surviving
+    matches in image i, matches maps image positions to DMatch
+    lists whose trainIdx is local to that image.
+    """
+    votes = np.zeros(len(db), dtype=np.int64)
+    matches = {}
+    if des_q is None or len(des_q) == 0 or len(db) == 0:
+        return votes, matches
+
+    if db.method == "SIFT":
+        q = des_q.astype(np.float32)
+        q_sq = (q ** 2).sum(axis=1)
+        max_rows = max(1, BLOCK_ELEMS // len(des_q))
+    else:
+        q = _hamming_query(des_q)
+        max_rows = max(1, min(BLOCK_ELEMS // len(des_q), MAX_KEY_COLS))
+
+    for i0, i1 in _image_blocks(db.offsets, max_rows):
+        r0, r1 = db.offsets[i0], db.offsets[i1]
+        starts = db.offsets[i0:i1] - r0
+        counts = np.diff(db.offsets[i0:i1 + 1])
+
+        if db.method == "SIFT":
+            d1, first, d2 = _nearest_l2(q, q_sq, db, r0, r1, starts, counts)
+        else:
+            d1, first, d2 = _nearest_hamming(q, db, r0, r1, starts)
+
+        # Images with a single descriptor have no second neighbour
+        keep = (d1 < ratio * d2) & (counts >= 2)[None, :]
+        votes[i0:i1] = keep.sum(axis=0)
+
+        img_local, q_idx = np.nonzero(keep.T)
+        for j, qi in zip(img_local, q_idx):
+            matches.setdefault(int(i0 + j), []).append(
+                cv2.DMatch(int(qi), int(first[qi, j]), float(d1[qi, j]))
+            )
+
+    return votes, matches
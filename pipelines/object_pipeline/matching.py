@@ -17,10 +17,18 @@ def ratio_test_match(des_q, des_d, method="ORB"):
         bf = cv2.BFMatcher(cv2.NORM_HAMMING)
 
     knn = bf.knnMatch(des_q, des_d, k=2)
+    return ratio_test(knn)
 
+
+# Lowe's ratio test over raw knnMatch output.
+# Pairs with fewer than two neighbours are skipped.
+def ratio_test(knn, ratio=RATIO_TEST):
     good = []
-    for m, n in knn:
-        if m.distance < RATIO_TEST * n.distance:
+    for pair in knn:
+        if len(pair) < 2:
+            continue
+        m, n = pair
+        if m.distance < ratio * n.distance:
             good.append(m)
 
     return good
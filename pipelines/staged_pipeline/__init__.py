@@ -0,0 +1,252 @@
+import os
+import cv2
+
+# --------------------------------------------------
+# Staged (pipelined) execution of both retrieval
+# pipelines. Images flow through bounded queues:
+#   decode (I/O threads) → cheap gate → features /
+#   matching (worker processes)
+# so disk reads, JPEG decoding and CPU-heavy matching
+# of different images overlap.
+#
+# Keypoints and matches cannot be pickled, so process
+# stages exchange them as plain arrays / tuples and the
+# final results are rebuilt in the calling process.
+# --------------------------------------------------
+from pipelines.object_pipeline import verify_candidate
+from pipelines.object_pipeline.color import (
+    COLOR_SIM_THRESHOLD, compute_hsv_hist, color_similarity
+)
+from pipelines.object_pipeline.features import extract_features
+from pipelines.logo_pipeline import shape_candidate, sift_candidate
+from pipelines.logo_pipeline.edges import extract_edges, extract_contours
+from utils.helpers import select_top_contours, contour_complexity
+from utils.index_store import keypoints_to_array, array_to_keypoints
+from utils.stages import Stage, run_stages, log_stage_report
+
+# Query state shipped once to every worker process
+_QUERY = {}
+
+
+def _matches_to_tuples(matches):
+    return [(m.queryIdx, m.trainIdx, m.distance) for m in matches]
+
+
+def _tuples_to_matches(tuples):
+    return [cv2.DMatch(int(q), int(t), float(d)) for q, t, d in tuples]
+
+
+def _default_workers():
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+# --------------------------------------------------
+# Object pipeline stages
+# --------------------------------------------------
+def _init_object_worker(kp_q, des_q, q_shape, budget, selection, wgc):
+    cv2.setNumThreads(1)
+    _QUERY["kp"] = array_to_keypoints(kp_q)
+    _QUERY["des"] = des_q
+    _QUERY["shape"] = q_shape
+    _QUERY["budget"] = budget
+    _QUERY["selection"] = selection
+    _QUERY["wgc"] = wgc
+
+
+def _decode_object(path):
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    bgr = cv2.imread(path)
+    if gray is None or bgr is None:
+        return None
+    return path, gray, bgr
+
+
+def _orb_stage(item):
+    path, gray, color_score = item
+    kp_d, des_d = extract_features(
+        gray, method="ORB", budget=_QUERY["budget"], selection=_QUERY["selection"]
+    )
+    if des_d is None:
+        return None
+    return path, keypoints_to_array(kp_d), des_d, color_score
+
+
+def _verify_stage(item):
+    path, kp_d, des_d, color_score = item
+    verified = verify_candidate(
+        _QUERY["kp"], _QUERY["des"], _QUERY["shape"],
+        array_to_keypoints(kp_d), des_d, color_score, _QUERY["wgc"]
+    )
+    if verified is None:
+        return None
+
+    score, inlier_matches = verified
+    return path, score, _matches_to_tuples(inlier_matches), kp_d
+
+
+def run_object_pipeline_staged(q_gray, q_bgr, kp_q, des_q, paths,
+                               budget=None, selection=None, pack=None, wgc=False,
+                               io_workers=4, cpu_workers=None, queue_size=16):
+    """
+    Staged variant of run_object_pipeline over image paths.
+
+    Stages: decode (threads) → color pre-filter (thread) →
+    ORB extraction (processes) → matching + RANSAC + scoring
+    (processes). Produces the same ranked results. With an
+    ImagePack, the decode stage reads pre-decoded pixels.
+    """
+    cpu_workers = cpu_workers or _default_workers()
+    q_hist = compute_hsv_hist(q_bgr)
+
+    # Color gate runs in a thread: OpenCV releases the GIL
+    def color_stage(item):
+        path, gray, bgr = item
+        sim = color_similarity(q_hist, compute_hsv_hist(bgr))
+        # Same test as color_prefilter: NaN similarities are rejected
+        if not sim >= COLOR_SIM_THRESHOLD:
+            return None
+        return path, gray, sim
+
+    def decode_packed(path):
+        gray, bgr = pack.read_gray(path), pack.read_bgr(path)
+        if gray is None or bgr is None:
+            return None
+        return path, gray, bgr
+
+    initargs = (
+        keypoints_to_array(kp_q), des_q, q_gray.shape, budget, selection, wgc
+    )
+    stages = [
+        Stage(
+            "decode", _decode_object if pack is None else decode_packed,
+            workers=io_workers
+        ),
+        Stage("color", color_stage, workers=1),
+        Stage(
+            "features", _orb_stage, workers=cpu_workers, kind="process",
+            initializer=_init_object_worker, initargs=initargs
+        ),
+        Stage(
+            "verify", _verify_stage, workers=cpu_workers, kind="process",
+            initializer=_init_object_worker, initargs=initargs
+        ),
+    ]
+
+    outputs, report = run_stages(paths, stages, queue_size=queue_size)
+    log_stage_report(report)
+
+    results = [
+        (path, score, _tuples_to_matches(matches), array_to_keypoints(kp_d))
+        for path, score, matches, kp_d in outputs
+    ]
+    # Outputs arrive in completion order: ties are broken by path
+    return sorted(results, key=lambda x: (-x[1], x[0]))
+
+
+# --------------------------------------------------
+# Logo pipeline stages
+# --------------------------------------------------
+def _init_logo_worker(q_contours, q_complexities, kp_q, des_q, roi_margin,
+                      budget, selection, codec):
+    cv2.setNumThreads(1)
+    _QUERY["contours"] = q_contours
+    _QUERY["complexities"] = q_complexities
+    _QUERY["kp"] = array_to_keypoints(kp_q) if kp_q is not None else None
+    _QUERY["des"] = des_q
+    _QUERY["roi_margin"] = roi_margin
+    _QUERY["sift"] = cv2.SIFT_create()
+    _QUERY["budget"] = budget
+    _QUERY["selection"] = selection
+    _QUERY["codec"] = codec
+
+
+def _decode_logo(path):
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+    return path, gray
+
+
+def _shape_stage(item):
+    path, gray = item
+    candidate = shape_candidate(
+        gray, _QUERY["contours"], _QUERY["complexities"], _QUERY["roi_margin"]
+    )
+    if candidate is None:
+        return None
+    return (path, gray) + candidate
+
+
+def _sift_stage(item):
+    path, gray, hu, shape, roi = item
+    verified = sift_candidate(
+        gray, roi, _QUERY["des"], hu, shape, _QUERY["sift"],
+        _QUERY["budget"], _QUERY["selection"], _QUERY["kp"], _QUERY["codec"]
+    )
+    if verified is None:
+        return None
+
+    score, good, kp_d = verified
+    return path, score, _matches_to_tuples(good), keypoints_to_array(kp_d)
+
+
+def run_logo_pipeline_staged(q_gray, paths, roi_margin=None,
+                             sift_budget=None, sift_selection=None, pack=None,
+                             wgc=False, sift_codec=None,
+                             io_workers=4, cpu_workers=None, queue_size=16):
+    """
+    Staged variant of run_logo_pipeline over image paths.
+
+    Stages: decode (threads) → contour / shape gate (processes) →
+    SIFT matching + score fusion (processes). Only images of the
+    logo benchmark are fed into the pipeline. With an ImagePack,
+    the decode stage reads pre-decoded pixels.
+    """
+    cpu_workers = cpu_workers or _default_workers()
+
+    q_contours = select_top_contours(extract_contours(extract_edges(q_gray)), k=3)
+    if not q_contours:
+        return []
+    q_complexities = [contour_complexity(c) for c in q_contours]
+
+    kp_q, des_q = cv2.SIFT_create().detectAndCompute(q_gray, None)
+    if des_q is None:
+        return []
+    if sift_codec is not None:
+        des_q = sift_codec.encode(des_q)
+
+    initargs = (
+        q_contours, q_complexities, keypoints_to_array(kp_q) if wgc else None,
+        des_q, roi_margin, sift_budget, sift_selection, sift_codec
+    )
+    def decode_packed(path):
+        gray = pack.read_gray(path)
+        if gray is None:
+            return None
+        return path, gray
+
+    stages = [
+        Stage(
+            "decode", _decode_logo if pack is None else decode_packed,
+            workers=io_workers
+        ),
+        Stage(
+            "shape", _shape_stage, workers=cpu_workers, kind="process",
+            initializer=_init_logo_worker, initargs=initargs
+        ),
+        Stage(
+            "sift", _sift_stage, workers=cpu_workers, kind="process",
+            initializer=_init_logo_worker, initargs=initargs
+        ),
+    ]
+
+    logo_paths = [p for p in paths if "flickr_logos_27_dataset" in p]
+    outputs, report = run_stages(logo_paths, stages, queue_size=queue_size)
+    log_stage_report(report)
+
+    results = [
+        (path, score, _tuples_to_matches(matches), array_to_keypoints(kp_d))
+        for path, score, matches, kp_d in outputs
+    ]
+    # Outputs arrive in completion order: ties are broken by path
+    return sorted(results, key=lambda x: (-x[1], x[0]))
@@ -0,0 +1,47 @@
+import os
+import shutil
+import sys
+
+import cv2
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The pipelines must be imported before utils.helpers
+import pipelines.object_pipeline  # noqa: E402,F401
+
+DATASET_DIR = os.path.join(ROOT, "data", "dataset")
+QUERIES_DIR = os.path.join(ROOT, "data", "queries")
+
+LOGO_IMAGES = os.path.join("flickr_logos_27_dataset", "flickr_logos_27_dataset_images")
+
+# Tiny fixture set: a few object and logo images of the shipped dataset
+FIXTURE_IMAGES = [
+    os.path.join("airplanes", "image_0001.jpg"),
+    os.path.join("airplanes", "image_0002.jpg"),
+    os.path.join("camera", "image_0001.jpg"),
+    os.path.join(LOGO_IMAGES, "106523337.jpg"),
+    os.path.join(LOGO_IMAGES, "1075391489.jpg"),
+    os.path.join(LOGO_IMAGES, "108232382.jpg"),
+]
+
+
+# Copy of the fixture images in a fresh dataset directory,
+# keeping the category layout expected by the pipelines.
+@pytest.fixture
+def tiny_dataset(tmp_path):
+    root = tmp_path / "dataset"
+    for rel in FIXTURE_IMAGES:
+        dst = root / rel
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(os.path.join(DATASET_DIR, rel), dst)
+    return str(root)
+
+
+def read_query(name):
+    return cv2.imread(os.path.join(QUERIES_DIR, name), cv2.IMREAD_GRAYSCALE)
+
+
+def read_fixture(rel):
+    return cv2.imread(os.path.join(DATASET_DIR, rel), cv2.IMREAD_GRAYSCALE)
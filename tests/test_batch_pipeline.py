@@ -0,0 +1,29 @@
+import cv2
+import pytest
+
+from conftest import FIXTURE_IMAGES, read_fixture, read_query
+from pipelines.batch_pipeline import stacked_knn_match
+from pipelines.object_pipeline.features import extract_features
+from pipelines.object_pipeline.matching import RATIO_TEST, ratio_test
+
+
+def as_tuples(matches):
+    return [(m.queryIdx, m.trainIdx, round(m.distance, 4)) for m in matches]
+
+
+@pytest.mark.parametrize("method, norm", [
+    ("ORB", cv2.NORM_HAMMING),
+    ("SIFT", cv2.NORM_L2),
+])
+def test_stacked_knn_matches_per_query_matching(method, norm):
+    queries = ["airplane-q1.jpg", "camera-q1.jpg", "apple-logo.jpg"]
+    des_list = [extract_features(read_query(q), method=method)[1] for q in queries]
+
+    for rel in FIXTURE_IMAGES[:4]:
+        _, des_d = extract_features(read_fixture(rel), method=method)
+        stacked = stacked_knn_match(des_list, des_d, norm, RATIO_TEST)
+
+        bf = cv2.BFMatcher(norm)
+        for des_q, got in zip(des_list, stacked):
+            expected = ratio_test(bf.knnMatch(des_q, des_d, k=2), RATIO_TEST)
+            assert as_tuples(got) == as_tuples(expected)
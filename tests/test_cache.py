@@ -0,0 +1,119 @@
+import os
+
+import pytest
+
+from utils import cache as cache_module
+from utils.cache import ResultCache, make_cache_key
+from utils.index_store import index_digest, write_manifest
+
+RESULTS = [("a.jpg", 0.9), ("b.jpg", 0.5)]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    return now
+
+
+def test_hit_and_miss():
+    cache = ResultCache("v1")
+    assert cache.get("k") is None
+    cache.put("k", RESULTS)
+    assert cache.get("k") == RESULTS
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_ttl_expiry(clock, tmp_path):
+    cache = ResultCache("v1", ttl=10, disk_dir=str(tmp_path))
+    cache.put("k", RESULTS)
+
+    clock[0] += 9
+    assert cache.get("k") == RESULTS
+
+    # Expired entries are misses, in memory and on disk
+    clock[0] += 2
+    assert cache.get("k") is None
+    assert ResultCache("v1", ttl=10, disk_dir=str(tmp_path)).get("k") is None
+
+
+def test_disk_store_shared_across_instances(tmp_path):
+    ResultCache("v1", disk_dir=str(tmp_path)).put("k", RESULTS)
+    assert ResultCache("v1", disk_dir=str(tmp_path)).get("k") == RESULTS
+
+
+def test_version_change_drops_persisted_entries(tmp_path):
+    ResultCache("v1", disk_dir=str(tmp_path)).put("k", RESULTS)
+
+    cache = ResultCache("v2", disk_dir=str(tmp_path))
+    assert cache.get("k") is None
+    assert not os.path.exists(os.path.join(tmp_path, "k.json"))
+
+    # Reopening with the original version does not resurrect them
+    assert ResultCache("v1", disk_dir=str(tmp_path)).get("k") is None
+
+
+def test_lru_capacity():
+    cache = ResultCache("v1", capacity=2)
+    cache.put("a", RESULTS)
+    cache.put("b", RESULTS)
+    cache.get("a")
+    cache.put("c", RESULTS)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == RESULTS
+    assert cache.get("c") == RESULTS
+
+
+def test_cache_key_depends_on_query_version_and_config():
+    key = make_cache_key("q", "v1", {"ratio": 0.75, "index": None})
+
+    assert key == make_cache_key("q", "v1", {"index": None, "ratio": 0.75})
+    assert key != make_cache_key("q2", "v1", {"ratio": 0.75, "index": None})
+    assert key != make_cache_key("q", "v2", {"ratio": 0.75, "index": None})
+    assert key != make_cache_key("q", "v1", {"ratio": 0.75, "index": "abc"})
+
+
+def test_index_digest_tracks_manifest_and_codec(tmp_path):
+    write_manifest(str(tmp_path), {"version": "v1", "done": [0]})
+    digest = index_digest(str(tmp_path))
+
+    # Chunk files are fixed by the manifest and do not count
+    (tmp_path / "chunk_00000.npz").write_bytes(b"x")
+    assert index_digest(str(tmp_path)) == digest
+
+    (tmp_path / "sift_codec.npz").write_bytes(b"pca-1")
+    with_codec = index_digest(str(tmp_path))
+    assert with_codec != digest
+
+    (tmp_path / "sift_codec.npz").write_bytes(b"pca-2")
+    assert index_digest(str(tmp_path)) != with_codec
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = ResultCache("v1", disk_dir=str(tmp_path))
+    (tmp_path / "k.json").write_text('{"time": 1000.0, "resu')
+
+    assert cache.get("k") is None
+    cache.put("k", RESULTS)
+    assert ResultCache("v1", disk_dir=str(tmp_path)).get("k") == RESULTS
+
+
+def test_expired_entries_are_deleted_from_disk(clock, tmp_path):
+    cache = ResultCache("v1", ttl=10, disk_dir=str(tmp_path))
+    cache.put("k", RESULTS)
+    assert os.path.exists(tmp_path / "k.json")
+
+    clock[0] += 11
+    assert cache.get("k") is None
+    assert not os.path.exists(tmp_path / "k.json")
+
+
+def test_disk_store_is_bounded(tmp_path):
+    cache = ResultCache("v1", disk_dir=str(tmp_path), disk_capacity=2)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, RESULTS)
+        os.utime(tmp_path / f"{key}.json", (1000 + i, 1000 + i))
+    cache.put("d", RESULTS)
+
+    assert sorted(os.listdir(tmp_path)) == ["VERSION", "c.json", "d.json"]
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import FIXTURE_IMAGES, read_fixture
+from pipelines.logo_pipeline.compact import (
+    CODEC_FILE, ROOT_SIFT_SCALE, SiftCodec, load_sift_codec, root_sift
+)
+from pipelines.object_pipeline.features import extract_features
+
+
+@pytest.fixture(scope="module")
+def sift_descriptors():
+    return [extract_features(read_fixture(rel), method="SIFT")[1] for rel in FIXTURE_IMAGES]
+
+
+@pytest.mark.parametrize("dim", [None, 32])
+def test_codec_save_load_round_trip(sift_descriptors, tmp_path, dim):
+    codec = SiftCodec.fit(sift_descriptors, dim)
+    codec.save(os.path.join(tmp_path, CODEC_FILE))
+    loaded = load_sift_codec(str(tmp_path))
+
+    assert loaded.dim == (128 if dim is None else dim)
+    for des in sift_descriptors:
+        np.testing.assert_array_equal(loaded.encode(des), codec.encode(des))
+
+
+def test_missing_codec(tmp_path):
+    assert load_sift_codec(str(tmp_path)) is None
+
+
+@pytest.mark.parametrize("dim", [None, 32])
+def test_codes_are_uint8(sift_descriptors, dim):
+    codec = SiftCodec.fit(sift_descriptors, dim)
+    codes = codec.encode(sift_descriptors[0])
+
+    assert codes.dtype == np.uint8
+    assert codes.shape == (len(sift_descriptors[0]), codec.dim)
+    assert codec.encode(None) is None
+    assert codec.encode(np.zeros((0, 128), np.float32)).shape == (0, codec.dim)
+
+
+def test_root_sift_codes_preserve_distances(sift_descriptors):
+    des = sift_descriptors[0][:50]
+    codes = SiftCodec().encode(des).astype(np.float32)
+    ref = root_sift(des)
+
+    # One quantization step for all dimensions: distances are
+    # scaled uniformly, up to at most one step per dimension
+    d_codes = np.linalg.norm(codes[:, None] - codes[None], axis=2)
+    d_ref = np.linalg.norm(ref[:, None] - ref[None], axis=2)
+    np.testing.assert_allclose(d_codes, ROOT_SIFT_SCALE * d_ref, atol=np.sqrt(128))
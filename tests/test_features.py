@@ -0,0 +1,48 @@
+import cv2
+import numpy as np
+import pytest
+
+from conftest import read_query
+from pipelines.object_pipeline import features
+from pipelines.object_pipeline.features import ANMS_ROBUST, extract_features, select_anms
+
+
+def random_keypoints(n, seed=0):
+    rng = np.random.default_rng(seed)
+    pts = rng.uniform(0, 200, size=(n, 2))
+    # Rounded responses give ties between keypoints
+    resp = np.round(rng.uniform(0, 1, size=n), 2)
+    return [cv2.KeyPoint(float(x), float(y), 5, -1, float(r)) for (x, y), r in zip(pts, resp)]
+
+
+# Reference ANMS: every keypoint against every other one.
+def brute_force_anms(kps, budget):
+    pts = np.float32([k.pt for k in kps])
+    resp = np.float32([k.response for k in kps])
+    d2 = ((pts[:, None] - pts[None]) ** 2).sum(axis=2)
+    d2[~(resp[:, None] < ANMS_ROBUST * resp[None, :])] = np.inf
+    radii = d2.min(axis=1)
+    return [kps[i] for i in np.lexsort((-resp, -radii))[:budget]]
+
+
+@pytest.mark.parametrize("block", [7, 512])
+def test_anms_equals_brute_force(block):
+    kps = random_keypoints(300)
+    selected = select_anms(kps, 50, block=block)
+    assert [k.pt for k in selected] == [k.pt for k in brute_force_anms(kps, 50)]
+
+
+def test_sift_detection_is_capped(monkeypatch):
+    image = read_query("laptop-q1.jpg")
+    created = []
+    sift_create = cv2.SIFT_create
+
+    def recording_create(*args, **kwargs):
+        created.append(kwargs.get("nfeatures"))
+        return sift_create(*args, **kwargs)
+
+    monkeypatch.setattr(features.cv2, "SIFT_create", recording_create)
+    kps, des = extract_features(image, method="SIFT", budget=40, selection="anms")
+
+    assert created == [40 * features.BUDGET_OVERSAMPLE]
+    assert len(kps) == len(des) == 40
@@ -0,0 +1,53 @@
+import cv2
+
+from pipelines.object_pipeline.geometry import WGC_SCALE_RANGE, wgc_filter
+
+
+# One match per (log2 scale ratio, angle difference) pair. Query
+# angles vary so that database angles wrap around 0/360 too.
+def make_matches(pairs):
+    kp_q, kp_d, matches = [], [], []
+    for i, (log_scale, d_angle) in enumerate(pairs):
+        q_size = 4.0 + i % 5
+        q_angle = (37.0 * i) % 360.0
+        kp_q.append(cv2.KeyPoint(10.0, 10.0, q_size, q_angle))
+        kp_d.append(cv2.KeyPoint(
+            20.0, 20.0, q_size * 2.0 ** log_scale, (q_angle + d_angle) % 360.0
+        ))
+        matches.append(cv2.DMatch(i, i, 0.0))
+    return kp_q, kp_d, matches
+
+
+def kept_indices(kp_q, kp_d, matches):
+    return sorted(m.queryIdx for m in wgc_filter(kp_q, kp_d, matches))
+
+
+def test_wgc_keeps_the_dominant_transform_across_the_angle_wrap():
+    # Scale x2 and a rotation near 0 degrees, spread over the
+    # 3x3 neighbourhood of the peak bin: log2 scales 0.6 / 1.1 /
+    # 1.6 fall in three scale bins, -15 / 5 / 30 degrees in the
+    # last, first and second angle bins
+    inliers = [(s, a) for s in (0.6, 1.1, 1.6) for a in (-15.0, 5.0, 30.0)]
+    inliers += [(1.1, 5.0)] * 3
+    outliers = [
+        (-2.0, 180.0), (-2.0, 90.0), (-3.0, 180.0), (3.5, 200.0),
+        (1.1, 120.0), (1.1, 240.0), (-1.0, 5.0), (3.0, -15.0),
+    ]
+    kp_q, kp_d, matches = make_matches(inliers + outliers)
+
+    assert kept_indices(kp_q, kp_d, matches) == list(range(len(inliers)))
+
+
+def test_wgc_clips_scale_ratios_out_of_range():
+    # Ratios beyond +/- WGC_SCALE_RANGE octaves fall in the edge
+    # bins instead of being dropped or wrapping to the other end
+    inliers = [(WGC_SCALE_RANGE + 1.0, 90.0), (WGC_SCALE_RANGE + 3.0, 95.0),
+               (WGC_SCALE_RANGE - 0.2, 100.0)]
+    outliers = [(-WGC_SCALE_RANGE - 2.0, 90.0), (0.0, 90.0), (0.0, 270.0)]
+    kp_q, kp_d, matches = make_matches(inliers + outliers)
+
+    assert kept_indices(kp_q, kp_d, matches) == [0, 1, 2]
+
+
+def test_wgc_without_matches():
+    assert wgc_filter([], [], []) == []
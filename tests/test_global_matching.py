@@ -0,0 +1,75 @@
+import cv2
+import numpy as np
+import pytest
+
+from conftest import FIXTURE_IMAGES, read_fixture, read_query
+from pipelines.logo_pipeline.compact import SiftCodec
+from pipelines.object_pipeline import global_matching
+from pipelines.object_pipeline.features import extract_features
+from pipelines.object_pipeline.global_matching import (
+    POPCOUNT, descriptor_matrix_from_dataset, global_ratio_match
+)
+from pipelines.object_pipeline.matching import RATIO_TEST, ratio_test
+
+
+def fixture_dataset():
+    return [(read_fixture(rel), rel) for rel in FIXTURE_IMAGES]
+
+
+# Per-image reference: one BFMatcher knnMatch + ratio test per image.
+def per_image_matches(des_q, db, norm):
+    bf = cv2.BFMatcher(norm)
+    expected = {}
+    for i in range(len(db)):
+        des_d = db.matrix[db.offsets[i]:db.offsets[i + 1]]
+        good = ratio_test(bf.knnMatch(des_q, des_d, k=2), RATIO_TEST)
+        if good:
+            expected[i] = good
+    return expected
+
+
+def as_tuples(matches):
+    return sorted((m.queryIdx, m.trainIdx) for m in matches)
+
+
+@pytest.mark.parametrize("method, norm, codec, query", [
+    ("ORB", cv2.NORM_HAMMING, None, "airplane-q1.jpg"),
+    ("SIFT", cv2.NORM_L2, None, "apple-logo.jpg"),
+    ("SIFT", cv2.NORM_L2, SiftCodec(), "apple-logo.jpg"),
+])
+def test_global_ratio_match_equals_per_image_bfmatcher(method, norm, codec, query):
+    db = descriptor_matrix_from_dataset(fixture_dataset(), method, sift_codec=codec)
+    _, des_q = extract_features(read_query(query), method=method)
+    if codec is not None:
+        des_q = codec.encode(des_q)
+
+    votes, matches = global_ratio_match(des_q, db, RATIO_TEST)
+    expected = per_image_matches(des_q, db, norm)
+
+    assert sorted(matches) == sorted(expected)
+    for i, good in expected.items():
+        assert votes[i] == len(good)
+        assert as_tuples(matches[i]) == as_tuples(good)
+        np.testing.assert_allclose(
+            sorted(m.distance for m in matches[i]),
+            sorted(m.distance for m in good),
+            rtol=1e-4, atol=1e-2
+        )
+
+
+def test_blocked_matching_equals_single_block(monkeypatch):
+    db = descriptor_matrix_from_dataset(fixture_dataset(), "ORB")
+    _, des_q = extract_features(read_query("camera-q1.jpg"), method="ORB")
+    votes, _ = global_ratio_match(des_q, db, RATIO_TEST)
+
+    # Blocks of roughly one image each
+    monkeypatch.setattr(global_matching, "BLOCK_ELEMS", len(des_q) * 300)
+    blocked_votes, _ = global_ratio_match(des_q, db, RATIO_TEST)
+
+    np.testing.assert_array_equal(votes, blocked_votes)
+
+
+def test_popcount_table():
+    values = np.arange(256, dtype=np.uint8)
+    expected = [bin(v).count("1") for v in range(256)]
+    np.testing.assert_array_equal(POPCOUNT[values], expected)
@@ -0,0 +1,86 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from utils.dataset import list_images, load_dataset
+from utils.image_pack import PIXELS, TABLE, ImagePack, build_image_pack, open_image_pack
+
+
+def test_pack_views_match_decoded_images(tiny_dataset, tmp_path):
+    pack_dir = str(tmp_path / "pack")
+    build_image_pack(tiny_dataset, pack_dir, bgr_scale=0.5)
+    pack = ImagePack(pack_dir)
+
+    assert pack.paths == list_images(tiny_dataset)
+    for path in pack.paths:
+        np.testing.assert_array_equal(
+            pack.read_gray(path), cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        )
+        expected = cv2.resize(
+            cv2.imread(path), None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA
+        )
+        np.testing.assert_array_equal(pack.read_bgr(path), expected)
+
+
+def test_offsets_tile_the_pixel_file(tiny_dataset, tmp_path):
+    pack_dir = str(tmp_path / "pack")
+    build_image_pack(tiny_dataset, pack_dir, bgr_scale=0.5)
+
+    with open(os.path.join(pack_dir, TABLE)) as fh:
+        table = json.load(fh)
+
+    offset = 0
+    for entry in table["entries"]:
+        for key, channels in (("gray", 1), ("bgr", 3)):
+            start, h, w = entry[key]
+            assert start == offset
+            offset += h * w * channels
+    assert offset == os.path.getsize(os.path.join(pack_dir, PIXELS))
+
+
+def test_load_dataset_matches_decoding(tiny_dataset, tmp_path):
+    pack_dir = str(tmp_path / "pack")
+    build_image_pack(tiny_dataset, pack_dir)
+    images, paths = ImagePack(pack_dir).load_dataset()
+
+    ref_images, ref_paths = load_dataset(tiny_dataset)
+    ref = dict(zip(ref_paths, ref_images))
+    assert sorted(paths) == sorted(ref_paths)
+    for img, path in zip(images, paths):
+        np.testing.assert_array_equal(img, ref[path])
+
+
+def test_unpacked_images_fall_back_to_decoding(tiny_dataset, tmp_path):
+    pack_dir = str(tmp_path / "pack")
+    build_image_pack(tiny_dataset, pack_dir)
+    pack = ImagePack(pack_dir)
+    path = pack.paths[0]
+
+    # BGR was not packed
+    np.testing.assert_array_equal(pack.read_bgr(path), cv2.imread(path))
+
+    extra = str(tmp_path / "extra.png")
+    cv2.imwrite(extra, np.full((4, 6), 7, np.uint8))
+    np.testing.assert_array_equal(pack.read_gray(extra), np.full((4, 6), 7, np.uint8))
+
+
+def test_stale_or_missing_pack_is_not_opened(tiny_dataset, tmp_path):
+    pack_dir = str(tmp_path / "pack")
+    assert open_image_pack(pack_dir, tiny_dataset) is None
+
+    build_image_pack(tiny_dataset, pack_dir)
+    assert open_image_pack(pack_dir, tiny_dataset) is not None
+
+    os.remove(os.path.join(tiny_dataset, "camera", "image_0001.jpg"))
+    assert open_image_pack(pack_dir, tiny_dataset) is None
+
+
+def test_rebuild_leaves_no_temporary_files(tiny_dataset, tmp_path):
+    pack_dir = str(tmp_path / "pack")
+    build_image_pack(tiny_dataset, pack_dir)
+    build_image_pack(tiny_dataset, pack_dir, bgr_scale=1.0)
+
+    assert sorted(os.listdir(pack_dir)) == sorted([PIXELS, TABLE])
+    assert ImagePack(pack_dir).bgr_scale == 1.0
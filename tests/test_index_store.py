@@ -0,0 +1,111 @@
+import os
+
+import numpy as np
+import pytest
+
+from index import build_index
+from pipelines.logo_pipeline.prefilter import orientation_index_from_index
+from pipelines.logo_pipeline.regions import load_region_index
+from pipelines.object_pipeline.global_matching import descriptor_matrix_from_index
+from utils.dataset import list_images
+from utils.index_store import (
+    chunk_path, iter_index, load_chunk, read_manifest, save_chunk, write_manifest
+)
+
+
+# Fixture dataset plus an unreadable image that sorts first, so
+# that with one image per chunk chunk 0 has no records.
+@pytest.fixture
+def dataset_with_empty_chunk(tiny_dataset):
+    with open(os.path.join(tiny_dataset, "airplanes", "0_broken.jpg"), "w") as fh:
+        fh.write("not an image")
+    return tiny_dataset
+
+
+def build(dataset_dir, index_dir):
+    return build_index(dataset_dir, index_dir, workers=1, chunk_size=1)
+
+
+def test_chunk_round_trip(tmp_path):
+    records = [
+        {"path": "a.jpg", "shape": np.array([4, 5]), "des": np.ones((3, 2), np.uint8)},
+        {"path": "b.jpg", "shape": np.array([6, 7]), "des": np.zeros((0, 2), np.uint8)},
+    ]
+    path = str(tmp_path / "chunk.npz")
+    save_chunk(path, records)
+
+    loaded = load_chunk(path)
+    assert [r["path"] for r in loaded] == ["a.jpg", "b.jpg"]
+    for rec, orig in zip(loaded, records):
+        np.testing.assert_array_equal(rec["shape"], orig["shape"])
+        np.testing.assert_array_equal(rec["des"], orig["des"])
+
+
+def test_complete_index_skips_only_empty_chunks(dataset_with_empty_chunk, tmp_path):
+    index_dir = str(tmp_path / "index")
+    manifest = build(dataset_with_empty_chunk, index_dir)
+
+    assert manifest["empty"] == [0]
+    assert not os.path.exists(chunk_path(index_dir, 0))
+
+    readable = [p for p in list_images(dataset_with_empty_chunk) if "broken" not in p]
+    assert [r["path"] for r in iter_index(index_dir)] == readable
+
+
+def test_resume_rebuilds_only_missing_chunks(dataset_with_empty_chunk, tmp_path):
+    index_dir = str(tmp_path / "index")
+    build(dataset_with_empty_chunk, index_dir)
+    kept = chunk_path(index_dir, 2)
+    mtime = os.stat(kept).st_mtime_ns
+
+    # Simulate a build killed after chunk 3: later chunks are not done
+    manifest = read_manifest(index_dir)
+    manifest["done"] = [0, 1, 2, 3]
+    write_manifest(index_dir, manifest)
+    os.remove(chunk_path(index_dir, 5))
+
+    with pytest.raises(ValueError, match="incomplete"):
+        list(iter_index(index_dir))
+
+    build(dataset_with_empty_chunk, index_dir)
+    assert os.stat(kept).st_mtime_ns == mtime
+    assert read_manifest(index_dir)["done"] == list(range(manifest["num_chunks"]))
+    assert len(list(iter_index(index_dir))) == manifest["num_images"] - 1
+
+
+def test_missing_chunk_file_is_refused(dataset_with_empty_chunk, tmp_path):
+    index_dir = str(tmp_path / "index")
+    build(dataset_with_empty_chunk, index_dir)
+    os.remove(chunk_path(index_dir, 1))
+
+    with pytest.raises(ValueError, match="incomplete"):
+        list(iter_index(index_dir))
+
+
+def test_stale_index_is_refused(dataset_with_empty_chunk, tmp_path):
+    index_dir = str(tmp_path / "index")
+    build(dataset_with_empty_chunk, index_dir)
+    os.remove(os.path.join(dataset_with_empty_chunk, "camera", "image_0001.jpg"))
+
+    with pytest.raises(ValueError, match="does not match"):
+        list(iter_index(index_dir))
+
+
+def test_missing_index(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        list(iter_index(str(tmp_path)))
+
+
+def test_index_mode_is_checked(tiny_dataset, tmp_path):
+    region_dir = str(tmp_path / "regions")
+    image_dir = str(tmp_path / "index")
+    build_index(tiny_dataset, region_dir, workers=1, regions=True)
+    build_index(tiny_dataset, image_dir, workers=1)
+
+    assert len(load_region_index(region_dir)) == 3
+    with pytest.raises(ValueError, match="is a region index"):
+        descriptor_matrix_from_index(region_dir, "SIFT")
+    with pytest.raises(ValueError, match="is a region index"):
+        orientation_index_from_index(region_dir, [])
+    with pytest.raises(ValueError, match="is not a region index"):
+        load_region_index(image_dir)
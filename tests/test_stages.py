@@ -0,0 +1,65 @@
+import pytest
+
+from utils.stages import Stage, run_stages
+
+
+# Stage functions are module-level so that process stages
+# can pickle them for their spawned workers.
+def double(x):
+    return 2 * x
+
+
+def keep_multiples_of_four(x):
+    return x if x % 4 == 0 else None
+
+
+def add_one(x):
+    return x + 1
+
+
+def fail_on_seven(x):
+    if x == 7:
+        raise ValueError("bad item")
+    return x
+
+
+def chain(workers, kind="thread"):
+    return [
+        Stage("double", double, workers=workers),
+        Stage("filter", keep_multiples_of_four, workers=workers, kind=kind),
+        Stage("add", add_one, workers=workers),
+    ]
+
+
+def expected(n):
+    return [2 * x + 1 for x in range(n) if (2 * x) % 4 == 0]
+
+
+@pytest.mark.parametrize("workers, kind", [(1, "thread"), (4, "thread"), (2, "process")])
+def test_all_items_arrive(workers, kind):
+    outputs, _ = run_stages(range(100), chain(workers, kind))
+    assert sorted(outputs) == expected(100)
+
+
+def test_report_counts_items():
+    _, report = run_stages(range(100), chain(3))
+
+    counts = [(r["stage"], r["items_in"], r["items_out"]) for r in report]
+    assert counts == [("double", 100, 100), ("filter", 100, 50), ("add", 50, 50)]
+    assert all(r["workers"] == 3 for r in report)
+
+
+def test_stage_error_is_raised_after_the_run():
+    stages = [Stage("fail", fail_on_seven, workers=2), Stage("add", add_one, workers=2)]
+
+    with pytest.raises(ValueError, match="bad item"):
+        run_stages(range(20), stages)
+
+    # The other items still went through every stage
+    assert stages[0].items_in == 20
+    assert stages[1].items_in == 19
+
+
+def test_queue_size_one_completes():
+    outputs, _ = run_stages(range(100), chain(3), queue_size=1)
+    assert sorted(outputs) == expected(100)
@@ -0,0 +1,44 @@
+import os
+
+# --------------------------------------------------
+# FlickrLogos-27 annotations.
+# Training rows are "<file> <label> <subset> x1 y1 x2 y2";
+# the same box is often listed once per subset.
+# --------------------------------------------------
+LOGO_DIR = "flickr_logos_27_dataset"
+LOGO_ANNOTATIONS = "flickr_logos_27_dataset_training_set_annotation.txt"
+LOGO_IMAGES = "flickr_logos_27_dataset_images"
+
+# Boxes smaller than this (pixels per side) carry no usable shape
+MIN_BOX_SIDE = 8
+
+
+def load_logo_annotations(root):
+    """
+    Read the training annotations of the logo dataset under `root`.
+
+    Returns a dict mapping image path to a list of unique
+    (label, (x1, y1, x2, y2)) boxes, in file order.
+    """
+    ann_path = os.path.join(root, LOGO_DIR, LOGO_ANNOTATIONS)
+    if not os.path.exists(ann_path):
+        return {}
+
+    annotations = {}
+    with open(ann_path) as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) < 7:
+                continue
+
+            x1, y1, x2, y2 = map(int, parts[3:7])
+            if x2 - x1 < MIN_BOX_SIDE or y2 - y1 < MIN_BOX_SIDE:
+                continue
+
+            p = os.path.join(root, LOGO_DIR, LOGO_IMAGES, parts[0])
+            entry = (parts[1], (x1, y1, x2, y2))
+            boxes = annotations.setdefault(p, [])
+            if entry not in boxes:
+                boxes.append(entry)
+
+    return annotations
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+from utils.logger import logger
+
+
+# Content hash of a file (e.g. the query image bytes).
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# Cache key: query content + dataset/index version + pipeline config.
+# The config is serialized with sorted keys so that equal settings
+# always produce the same key.
+def make_cache_key(query_digest, dataset_version, config):
+    payload = json.dumps(
+        [query_digest, dataset_version, config], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# Write a JSON file under a temporary name and rename it, so that
+# concurrent readers never see a truncated file.
+def write_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(data, fh)
+    os.replace(tmp, path)
+
+
+class ResultCache:
+    """
+    Ranked-result cache with LRU/TTL eviction and an optional disk store.
+
+    Values are lists of (path, score) pairs. The in-memory layer keeps
+    at most `capacity` entries; entries older than `ttl` seconds are
+    treated as misses. With `disk_dir`, entries are also persisted as
+    JSON files so that separate runs share the cache. Expired files
+    are deleted when they are looked up, and the store keeps at most
+    `disk_capacity` entries, dropping the least recently written.
+
+    The store is bound to a dataset `version`: opening it with a
+    different version (i.e. the dataset manifest changed) drops all
+    persisted entries.
+    """
+
+    def __init__(self, version, capacity=256, ttl=None, disk_dir=None,
+                 disk_capacity=4096):
+        self.version = version
+        self.capacity = capacity
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_capacity = disk_capacity
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._check_version()
+
+    # --------------------------------------------------
+    # Disk store helpers
+    # --------------------------------------------------
+    def _entry_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _entry_files(self):
+        return [
+            f for f in os.listdir(self.disk_dir)
+            if f.endswith(".json") and f != "stats.json"
+        ]
+
+    # Entry stored on disk, or None if missing or unreadable
+    # (e.g. written by an older version of the cache).
+    def _read_entry(self, key):
+        try:
+            with open(self._entry_path(key)) as fh:
+                data = json.load(fh)
+            return data["time"], [tuple(r) for r in data["results"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _remove_entry(self, key):
+        try:
+            os.remove(self._entry_path(key))
+        except FileNotFoundError:
+            pass
+
+    # Keep the disk store within disk_capacity entries.
+    def _prune_disk(self):
+        files = self._entry_files()
+        if len(files) <= self.disk_capacity:
+            return
+
+        def mtime(f):
+            try:
+                return os.path.getmtime(os.path.join(self.disk_dir, f))
+            except FileNotFoundError:
+                return 0.0
+
+        files.sort(key=mtime)
+        for f in files[:len(files) - self.disk_capacity]:
+            self._remove_entry(f[:-len(".json")])
+
+    def _check_version(self):
+        version_path = os.path.join(self.disk_dir, "VERSION")
+        stored = None
+        if os.path.exists(version_path):
+            with open(version_path) as fh:
+                stored = fh.read().strip()
+
+        if stored == self.version:
+            return
+
+        removed = 0
+        for f in self._entry_files():
+            self._remove_entry(f[:-len(".json")])
+            removed += 1
+
+        if stored is not None:
+            logger.info(f"Dataset changed, invalidated {removed} cached results")
+
+        tmp = f"{version_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            fh.write(self.version)
+        os.replace(tmp, version_path)
+
+    def _expired(self, stamp):
+        return self.ttl is not None and time.time() - stamp > self.ttl
+
+    # --------------------------------------------------
+    # Public interface
+    # --------------------------------------------------
+    def get(self, key):
+        entry = self.memory.get(key)
+
+        if entry is None and self.disk_dir:
+            entry = self._read_entry(key)
+
+        if entry is not None and self._expired(entry[0]):
+            self.memory.pop(key, None)
+            if self.disk_dir:
+                self._remove_entry(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._remember(key, entry)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, results):
+        entry = (time.time(), [(path, float(score)) for path, score in results])
+        self._remember(key, entry)
+
+        if self.disk_dir:
+            write_json(self._entry_path(key), {"time": entry[0], "results": entry[1]})
+            self._prune_disk()
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self):
+        """Log session and, with a disk store, cumulative hit ratios."""
+        logger.info(
+            f"Result cache: {self.hits} hits / {self.misses} misses "
+            f"(hit ratio {self.hit_ratio():.2f})"
+        )
+
+        if not self.disk_dir:
+            return
+
+        stats_path = os.path.join(self.disk_dir, "stats.json")
+        stats = {"hits": 0, "misses": 0}
+        try:
+            with open(stats_path) as fh:
+                stats = json.load(fh)
+        except (OSError, ValueError):
+            pass
+
+        stats["hits"] += self.hits
+        stats["misses"] += self.misses
+        write_json(stats_path, stats)
+
+        total = stats["hits"] + stats["misses"]
+        logger.info(
+            f"Result cache (all runs): {stats['hits']} hits / "
+            f"{stats['misses']} misses (hit ratio "
+            f"{stats['hits'] / total if total else 0.0:.2f})"
+        )
+        self.hits = self.misses = 0
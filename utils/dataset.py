@@ -1,7 +1,10 @@
+import hashlib
 import os
 import cv2
 from utils.logger import logger
 
+IMAGE_EXTENSIONS = (".jpg", ".png", ".jpeg")
+
 def load_dataset(root):
     images, paths = [], []
 
@@ -9,7 +12,7 @@ def load_dataset(root):
 
     for r, _, files in os.walk(root):
         for f in files:
-            if f.lower().endswith((".jpg", ".png", ".jpeg")):
+            if f.lower().endswith(IMAGE_EXTENSIONS):
                 p = os.path.join(r, f)
                 img = cv2.imread(p, cv2.IMREAD_GRAYSCALE)
                 if img is None:
@@ -19,3 +22,31 @@ def load_dataset(root):
 
     logger.info(f"Loaded {len(images)} images from dataset")
     return images, paths
+
+
+# Deterministic, sorted list of dataset image paths.
+# Used where images are streamed instead of preloaded.
+def list_images(root):
+    paths = []
+    for r, _, files in os.walk(root):
+        for f in files:
+            if f.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(r, f))
+    return sorted(paths)
+
+
+# Version of the dataset manifest.
+# Hashes every file's relative path, size and modification time,
+# so adding, removing or rewriting any file changes the version
+# without reading image contents.
+def dataset_version(root):
+    h = hashlib.sha256()
+
+    for r, dirs, files in os.walk(root):
+        dirs.sort()
+        for f in sorted(files):
+            p = os.path.join(r, f)
+            st = os.stat(p)
+            h.update(f"{os.path.relpath(p, root)}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+
+    return h.hexdigest()
@@ -1,5 +1,8 @@
 import cv2
-from pipelines.logo_pipeline.shape import hu_similarity, shape_similarity
+import numpy as np
+from pipelines.logo_pipeline.shape import (
+    hu_similarity, shape_similarity, SHAPE_HU_WEIGHT, SHAPE_CONTOUR_WEIGHT
+)
 
 
 # Estimate contour complexity via polygonal approximation.
@@ -28,15 +31,68 @@ def select_top_contours(contours, k=3, min_area=50, min_perimeter=80):
 # Find the best shape correspondence between two contour sets.
 # Returns the maximum similarity over all contour pairs.
 def best_shape_match(q_contours, d_contours):
+    best_hu, best_shape, _ = shape_match_details(q_contours, d_contours)
+    return best_hu, best_shape
+
+
+# Same as best_shape_match, but additionally returns, for every
+# database contour, its best fused shape score over all query
+# contours. Used to locate the matching region in the image.
+def shape_match_details(q_contours, d_contours, w_hu=SHAPE_HU_WEIGHT,
+                        w_shape=SHAPE_CONTOUR_WEIGHT):
     best_hu = 0.0
     best_shape = 0.0
+    per_contour = [0.0] * len(d_contours)
 
     for qc in q_contours:
-        for dc in d_contours:
+        for j, dc in enumerate(d_contours):
             hu = hu_similarity(qc, dc)
             shape = shape_similarity(qc, dc)
 
             best_hu = max(best_hu, hu)
             best_shape = max(best_shape, shape)
+            per_contour[j] = max(per_contour[j], w_hu * hu + w_shape * shape)
 
-    return best_hu, best_shape
+    return best_hu, best_shape, per_contour
+
+
+# Bounding boxes (x1, y1, x2, y2) of contours, enlarged around
+# their center by `margin` and clipped to the image.
+def contour_boxes(contours, img_shape, margin=1.5):
+    h, w = img_shape[:2]
+    boxes = []
+
+    for c in contours:
+        x, y, bw, bh = cv2.boundingRect(c)
+        cx, cy = x + bw / 2.0, y + bh / 2.0
+        hw, hh = bw * margin / 2.0, bh * margin / 2.0
+        boxes.append((
+            max(0, int(cx - hw)), max(0, int(cy - hh)),
+            min(w, int(np.ceil(cx + hw))), min(h, int(np.ceil(cy + hh)))
+        ))
+
+    return boxes
+
+
+# Detection mask covering the union of boxes (255 = detect).
+def boxes_mask(boxes, img_shape):
+    mask = np.zeros(img_shape[:2], dtype=np.uint8)
+    for x1, y1, x2, y2 in boxes:
+        mask[y1:y2, x1:x2] = 255
+    return mask
+
+
+# Spatial lookup: which keypoints fall inside any of the boxes.
+# `points` is an (N, 2) array of (x, y); returns a boolean mask.
+def points_in_boxes(points, boxes):
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+    if not boxes:
+        return np.zeros(len(points), dtype=bool)
+
+    b = np.asarray(boxes, dtype=np.float32)
+    x, y = points[:, 0:1], points[:, 1:2]
+    inside = (
+        (x >= b[:, 0]) & (x < b[:, 2]) &
+        (y >= b[:, 1]) & (y < b[:, 3])
+    )
+    return inside.any(axis=1)
@@ -0,0 +1,148 @@
+import json
+import os
+import cv2
+import numpy as np
+
+from utils.dataset import dataset_version, list_images
+from utils.logger import logger
+
+# --------------------------------------------------
+# Pre-decoded image pack.
+# All dataset images are decoded once and stored raw:
+#   <pack_dir>/pixels.bin   concatenated uint8 pixels
+#   <pack_dir>/pack.json    offset table + dataset version
+#
+# The pixel file is opened with np.memmap, so images are
+# zero-copy views served from the OS page cache, which is
+# shared by every process reading the same pack.
+# --------------------------------------------------
+PIXELS = "pixels.bin"
+TABLE = "pack.json"
+
+
+def build_image_pack(dataset_dir, pack_dir, bgr_scale=None):
+    """
+    Decode every dataset image into a pack.
+
+    Grayscale pixels are always stored. With `bgr_scale` set,
+    the BGR image resized by that factor is stored as well
+    (1.0 keeps full resolution); it is only used for color
+    histograms, which tolerate downscaling.
+    """
+    os.makedirs(pack_dir, exist_ok=True)
+
+    entries = []
+    offset = 0
+    tmp = os.path.join(pack_dir, PIXELS + ".tmp")
+
+    with open(tmp, "wb") as fh:
+        for path in list_images(dataset_dir):
+            bgr = cv2.imread(path)
+            if bgr is None:
+                continue
+            # Same decoder path as load_dataset
+            gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+
+            entry = {"path": path, "gray": [offset, *gray.shape[:2]], "bgr": None}
+            fh.write(gray.tobytes())
+            offset += gray.size
+
+            if bgr_scale is not None:
+                if bgr_scale != 1.0:
+                    bgr = cv2.resize(
+                        bgr, None, fx=bgr_scale, fy=bgr_scale,
+                        interpolation=cv2.INTER_AREA
+                    )
+                entry["bgr"] = [offset, *bgr.shape[:2]]
+                fh.write(bgr.tobytes())
+                offset += bgr.size
+
+            entries.append(entry)
+
+    # The old offset table must not outlive its pixels: drop it
+    # before swapping the pixel file, then write the new one under
+    # a temporary name. An interrupted build leaves no table, and
+    # open_image_pack falls back to decoding.
+    table_path = os.path.join(pack_dir, TABLE)
+    if os.path.exists(table_path):
+        os.remove(table_path)
+    os.replace(tmp, os.path.join(pack_dir, PIXELS))
+
+    table = {
+        "version": dataset_version(dataset_dir),
+        "dataset": dataset_dir,
+        "bgr_scale": bgr_scale,
+        "entries": entries,
+    }
+    with open(table_path + ".tmp", "w") as fh:
+        json.dump(table, fh)
+    os.replace(table_path + ".tmp", table_path)
+
+    logger.info(
+        f"Image pack: {len(entries)} images, {offset / 1e6:.1f} MB in {pack_dir}"
+    )
+    return table
+
+
+class ImagePack:
+    """
+    Read-only view of an image pack.
+
+    Images of the pack are returned as memmap views; images
+    missing from the pack (or BGR when it was not packed)
+    fall back to decoding the file.
+    """
+
+    def __init__(self, pack_dir):
+        with open(os.path.join(pack_dir, TABLE)) as fh:
+            table = json.load(fh)
+
+        self.version = table["version"]
+        self.bgr_scale = table["bgr_scale"]
+        self.entries = {e["path"]: e for e in table["entries"]}
+        self.paths = [e["path"] for e in table["entries"]]
+
+        size = os.path.getsize(os.path.join(pack_dir, PIXELS))
+        self._pixels = (
+            np.memmap(os.path.join(pack_dir, PIXELS), dtype=np.uint8, mode="r")
+            if size else np.zeros(0, np.uint8)
+        )
+
+    def __len__(self):
+        return len(self.paths)
+
+    def _view(self, offset, h, w, channels=1):
+        shape = (h, w) if channels == 1 else (h, w, channels)
+        return self._pixels[offset:offset + h * w * channels].reshape(shape)
+
+    def read_gray(self, path):
+        entry = self.entries.get(path)
+        if entry is None:
+            return cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        return self._view(*entry["gray"])
+
+    def read_bgr(self, path):
+        entry = self.entries.get(path)
+        if entry is None or entry["bgr"] is None:
+            return cv2.imread(path)
+        return self._view(*entry["bgr"], channels=3)
+
+    # Same (images, paths) interface as load_dataset.
+    def load_dataset(self):
+        logger.info(f"Loaded {len(self.paths)} images from image pack")
+        return [self.read_gray(p) for p in self.paths], list(self.paths)
+
+
+# Open a pack only if it matches the current dataset.
+# Returns None (with a warning) for missing or stale packs.
+def open_image_pack(pack_dir, dataset_dir):
+    if not os.path.exists(os.path.join(pack_dir, TABLE)):
+        logger.warning(f"No image pack in {pack_dir}, decoding images")
+        return None
+
+    pack = ImagePack(pack_dir)
+    if pack.version != dataset_version(dataset_dir):
+        logger.warning(f"Image pack in {pack_dir} is stale, decoding images")
+        return None
+
+    return pack
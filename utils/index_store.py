@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import cv2
+import numpy as np
+
+from utils.dataset import dataset_version
+
+# --------------------------------------------------
+# On-disk feature index.
+# The index is a directory of fixed-size chunks plus a
+# manifest used for checkpointing:
+#   <index_dir>/index.json        build state
+#   <index_dir>/chunk_00000.npz   records of chunk 0
+#
+# Inside a chunk, each record field is stored as one
+# concatenated array; variable-length fields get an extra
+# "<field>__offsets" array with per-record boundaries.
+# --------------------------------------------------
+MANIFEST = "index.json"
+OFFSETS = "__offsets"
+
+# Keypoint layout: x, y, size, angle, response, octave
+KEYPOINT_FIELDS = 6
+
+
+def keypoints_to_array(kps):
+    if not kps:
+        return np.zeros((0, KEYPOINT_FIELDS), dtype=np.float32)
+    return np.array(
+        [(k.pt[0], k.pt[1], k.size, k.angle, k.response, k.octave) for k in kps],
+        dtype=np.float32
+    )
+
+
+def array_to_keypoints(arr):
+    return [
+        cv2.KeyPoint(float(x), float(y), float(s), float(a), float(r), int(o))
+        for x, y, s, a, r, o in arr
+    ]
+
+
+def chunk_path(index_dir, chunk_id):
+    return os.path.join(index_dir, f"chunk_{chunk_id:05d}.npz")
+
+
+# Write a list of records (dicts of str / ndarray) as one chunk.
+# Every record must have a "path" field.
+# The file is written under a temporary name and renamed, so an
+# interrupted build never leaves a truncated chunk behind.
+def save_chunk(path, records):
+    arrays = {}
+
+    for field in records[0]:
+        values = [r[field] for r in records]
+
+        if isinstance(values[0], str):
+            arrays[field] = np.array(values)
+            continue
+
+        values = [np.asarray(v) for v in values]
+        if values[0].ndim == 0:
+            arrays[field] = np.stack(values)
+            continue
+
+        arrays[field] = np.concatenate(values, axis=0)
+        arrays[field + OFFSETS] = np.cumsum([0] + [len(v) for v in values])
+
+    tmp = path[:-len(".npz")] + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+# Read a chunk back into a list of records.
+def load_chunk(path):
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {k: data[k] for k in data.files}
+
+    fields = [k for k in arrays if not k.endswith(OFFSETS)]
+    n = len(arrays["path"])
+
+    records = [{} for _ in range(n)]
+    for field in fields:
+        values = arrays[field]
+        offsets = arrays.get(field + OFFSETS)
+        for i, rec in enumerate(records):
+            if offsets is None:
+                v = values[i]
+                rec[field] = str(v) if values.dtype.kind == "U" else v
+            else:
+                rec[field] = values[offsets[i]:offsets[i + 1]]
+
+    return records
+
+
+def read_manifest(index_dir):
+    path = os.path.join(index_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def write_manifest(index_dir, manifest):
+    path = os.path.join(index_dir, MANIFEST)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp, path)
+
+
+# Manifest of a complete index that matches the dataset it was
+# built from (`dataset_dir`, by default the one recorded by the
+# build) and the expected mode (whole images, or annotated
+# regions with `regions`). Raises ValueError for interrupted or
+# stale builds and for indexes of the other mode.
+def check_index(index_dir, dataset_dir=None, regions=False):
+    manifest = read_manifest(index_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No index found in {index_dir}")
+
+    if manifest.get("regions", False) != regions:
+        raise ValueError(
+            f"{index_dir} is a region index" if not regions
+            else f"{index_dir} is not a region index"
+        )
+
+    missing = [
+        i for i in range(manifest["num_chunks"])
+        if i not in manifest["done"] or (
+            i not in manifest.get("empty", []) and
+            not os.path.exists(chunk_path(index_dir, i))
+        )
+    ]
+    if missing:
+        raise ValueError(
+            f"Index in {index_dir} is incomplete ({len(missing)}/"
+            f"{manifest['num_chunks']} chunks missing), resume index.py build"
+        )
+
+    dataset_dir = dataset_dir or manifest["dataset"]
+    if manifest["version"] != dataset_version(dataset_dir):
+        raise ValueError(
+            f"Index in {index_dir} does not match {dataset_dir}, rebuild it"
+        )
+
+    return manifest
+
+
+# Iterate over all records of a complete, up-to-date index,
+# in path order.
+def iter_index(index_dir, dataset_dir=None, regions=False):
+    manifest = check_index(index_dir, dataset_dir, regions)
+    empty = set(manifest.get("empty", []))
+
+    for chunk_id in range(manifest["num_chunks"]):
+        # Chunks without any readable image are not written
+        if chunk_id not in empty:
+            yield from load_chunk(chunk_path(index_dir, chunk_id))
+
+
+# Fingerprint of an index build: digest of the manifest and of
+# the other small files stored next to the chunks (e.g. a SIFT
+# codec). Chunks are fixed by the manifest, so they are skipped.
+def index_digest(index_dir):
+    h = hashlib.sha256()
+    for f in sorted(os.listdir(index_dir)):
+        if f.startswith("chunk_") or ".tmp" in f:
+            continue
+        with open(os.path.join(index_dir, f), "rb") as fh:
+            h.update(f.encode() + b"\0" + fh.read())
+    return h.hexdigest()
+
+
+# Total size in bytes of the index files.
+def index_size(index_dir):
+    return sum(
+        os.path.getsize(os.path.join(index_dir, f))
+        for f in os.listdir(index_dir)
+    )
@@ -0,0 +1,181 @@
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.logger import logger
+
+# End-of-stream marker passed between stages
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a staged pipeline.
+
+    `fn` maps an item to the next item, or to None to drop it
+    (e.g. a rejected candidate). `kind` selects where `fn` runs:
+      - "thread": in `workers` threads (I/O, GIL-releasing code),
+      - "process": in a pool of `workers` processes; `fn` must then
+        be a picklable module-level function, and `initializer` /
+        `initargs` can ship shared read-only state (e.g. the query)
+        to every worker once.
+    """
+
+    def __init__(self, name, fn, workers=1, kind="thread",
+                 initializer=None, initargs=()):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.kind = kind
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self.busy = 0.0
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = []
+        self._lock = threading.Lock()
+
+
+def run_stages(source, stages, queue_size=16):
+    """
+    Run `source` items through `stages` connected by bounded queues.
+
+    Each stage consumes from its input queue with its own workers,
+    so decoding, feature extraction and matching of different items
+    overlap. Queues hold at most `queue_size` items: a slow stage
+    blocks its producers (backpressure) and memory stays flat.
+
+    Returns (outputs of the last stage, per-stage statistics).
+    Output order is not guaranteed.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    pools = {}
+    outputs = []
+
+    # Worker processes are spawned, not forked: the stage
+    # threads are already running when they start
+    ctx = mp.get_context("spawn")
+    for stage in stages:
+        if stage.kind == "process":
+            pools[stage.name] = ProcessPoolExecutor(
+                max_workers=stage.workers,
+                mp_context=ctx,
+                initializer=stage.initializer,
+                initargs=stage.initargs
+            )
+
+    # --------------------------------------------------
+    # Stage worker: take, process, forward. The last worker
+    # of a stage to finish forwards one end marker per
+    # worker of the next stage.
+    # --------------------------------------------------
+    remaining = [stage.workers for stage in stages]
+    remaining_lock = threading.Lock()
+
+    def worker(i, stage):
+        q_in, q_out = queues[i], queues[i + 1]
+        pool = pools.get(stage.name)
+
+        while True:
+            item = q_in.get()
+            if item is _DONE:
+                break
+
+            t0 = time.perf_counter()
+            try:
+                if pool is not None:
+                    result = pool.submit(stage.fn, item).result()
+                else:
+                    result = stage.fn(item)
+            except Exception as e:
+                result = None
+                stage.errors.append(e)
+            elapsed = time.perf_counter() - t0
+
+            with stage._lock:
+                stage.busy += elapsed
+                stage.items_in += 1
+                if result is not None:
+                    stage.items_out += 1
+
+            if result is not None:
+                q_out.put(result)
+
+        with remaining_lock:
+            remaining[i] -= 1
+            last = remaining[i] == 0
+
+        if last:
+            n_next = stages[i + 1].workers if i + 1 < len(stages) else 1
+            for _ in range(n_next):
+                q_out.put(_DONE)
+
+    def feeder():
+        for item in source:
+            queues[0].put(item)
+        for _ in range(stages[0].workers):
+            queues[0].put(_DONE)
+
+    threads = [threading.Thread(target=feeder, daemon=True)]
+    for i, stage in enumerate(stages):
+        threads += [
+            threading.Thread(target=worker, args=(i, stage), daemon=True)
+            for _ in range(stage.workers)
+        ]
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+
+    # Drain the last queue in the calling thread
+    while True:
+        item = queues[-1].get()
+        if item is _DONE:
+            break
+        outputs.append(item)
+
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    for pool in pools.values():
+        pool.shutdown()
+
+    for stage in stages:
+        if stage.errors:
+            raise stage.errors[0]
+
+    return outputs, stage_report(stages, wall)
+
+
+# Per-stage utilization: busy time over available worker time.
+# The stage closest to 100% is the bottleneck.
+def stage_report(stages, wall):
+    report = []
+    for stage in stages:
+        util = stage.busy / (wall * stage.workers) if wall > 0 else 0.0
+        report.append({
+            "stage": stage.name,
+            "kind": stage.kind,
+            "workers": stage.workers,
+            "items_in": stage.items_in,
+            "items_out": stage.items_out,
+            "busy_s": stage.busy,
+            "utilization": util,
+        })
+
+    return report
+
+
+def log_stage_report(report):
+    bottleneck = max(report, key=lambda r: r["utilization"])
+    for r in report:
+        logger.info(
+            f"Stage {r['stage']:<10} {r['kind']:<7} x{r['workers']:<2} "
+            f"in={r['items_in']:<6} out={r['items_out']:<6} "
+            f"busy={r['busy_s']:.1f}s util={r['utilization']:.0%}"
+        )
+    logger.info(f"Bottleneck stage: {bottleneck['stage']}")
@@ -0,0 +1,161 @@
+import os
+import cv2
+import numpy as np
+from utils.logger import logger
+from utils.dataset import IMAGE_EXTENSIONS
+from utils.annotations import LOGO_DIR, load_logo_annotations
+
+# --------------------------------------------------
+# Synthetic dataset generation for scaling experiments.
+# Larger collections are derived from the shipped images:
+#  - object images: scale / rotation / crop / color jitter
+#  - logo images: annotated logo crops pasted at random
+#    into distractor backgrounds
+# --------------------------------------------------
+
+
+# Collect source image paths, split into logo and object images.
+def collect_sources(root):
+    logos, objects = [], []
+
+    for r, _, files in os.walk(root):
+        for f in sorted(files):
+            if not f.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            p = os.path.join(r, f)
+            (logos if LOGO_DIR in p else objects).append(p)
+
+    return sorted(logos), sorted(objects)
+
+
+# Random geometric and photometric augmentation.
+def augment(img, rng):
+    h, w = img.shape[:2]
+
+    # Rotation + scale around the image center
+    angle = rng.uniform(-30, 30)
+    scale = rng.uniform(0.6, 1.4)
+    M = cv2.getRotationMatrix2D((w / 2, h / 2), angle, scale)
+    img = cv2.warpAffine(img, M, (w, h), borderMode=cv2.BORDER_REFLECT)
+
+    # Random crop keeping 70-100% of each side
+    cw = int(w * rng.uniform(0.7, 1.0))
+    ch = int(h * rng.uniform(0.7, 1.0))
+    x = int(rng.integers(0, w - cw + 1))
+    y = int(rng.integers(0, h - ch + 1))
+    img = img[y:y + ch, x:x + cw]
+
+    # Color jitter in HSV space
+    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV).astype(np.float32)
+    hsv[..., 0] = (hsv[..., 0] + rng.uniform(-8, 8)) % 180
+    hsv[..., 1] *= rng.uniform(0.7, 1.3)
+    hsv[..., 2] *= rng.uniform(0.7, 1.3)
+    hsv = np.clip(hsv, 0, 255).astype(np.uint8)
+
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+
+
+# Paste a (possibly augmented) logo crop at a random location.
+def paste_logo(background, logo, rng):
+    bh, bw = background.shape[:2]
+    lh, lw = logo.shape[:2]
+
+    # Logo occupies 10-35% of the background width
+    target_w = max(8, int(bw * rng.uniform(0.10, 0.35)))
+    scale = min(target_w / lw, 0.9 * bh / lh)
+    logo = cv2.resize(logo, None, fx=scale, fy=scale)
+    lh, lw = logo.shape[:2]
+
+    x = int(rng.integers(0, bw - lw + 1))
+    y = int(rng.integers(0, bh - lh + 1))
+
+    out = background.copy()
+    out[y:y + lh, x:x + lw] = logo
+    return out
+
+
+# Generate a single synthetic sample.
+# Even indices are augmented object images, odd indices are
+# logo composites, so every prefix of the pool is balanced.
+def synthesize_sample(i, objects, logo_boxes, backgrounds, seed=0):
+    rng = np.random.default_rng(seed * 1_000_003 + i)
+
+    if i % 2 == 1 and logo_boxes:
+        p, x1, y1, x2, y2 = logo_boxes[rng.integers(len(logo_boxes))]
+        src = cv2.imread(p)
+        bg = cv2.imread(backgrounds[rng.integers(len(backgrounds))])
+        if src is None or bg is None:
+            return None, None
+        logo = augment(src[y1:y2, x1:x2], rng)
+        return LOGO_DIR, paste_logo(augment(bg, rng), logo, rng)
+
+    p = objects[rng.integers(len(objects))]
+    img = cv2.imread(p)
+    if img is None:
+        return None, None
+    category = os.path.basename(os.path.dirname(p))
+    return category, augment(img, rng)
+
+
+def synthesize_dataset(src_root, out_root, size, seed=0):
+    """
+    Materialize a synthetic dataset of `size` images.
+
+    Samples are generated once into a pool shared by all sizes
+    of a seed (<out_root>/seed_<s>/pool) and are deterministic in
+    their index, so larger datasets are supersets of smaller ones.
+    Each size gets its own directory (<out_root>/seed_<s>/size_<n>)
+    made of links into the pool, keeping the layout expected by
+    load_dataset and by the logo pipeline's dataset filter.
+
+    Returns the directory of the requested size.
+    """
+    logos, objects = collect_sources(src_root)
+    logo_boxes = [
+        (p, *box)
+        for p, boxes in load_logo_annotations(src_root).items()
+        for _, box in boxes
+    ]
+    backgrounds = objects + logos
+    categories = [LOGO_DIR] + sorted(
+        {os.path.basename(os.path.dirname(p)) for p in objects}
+    )
+
+    # Samples depend on the seed, so every seed has its own pool
+    seed_dir = os.path.join(out_root, f"seed_{seed}")
+    pool = os.path.join(seed_dir, "pool")
+    size_dir = os.path.join(seed_dir, f"size_{size}")
+
+    created = 0
+    for i in range(size):
+        name = f"synth_{i:07d}.jpg"
+        link = None
+
+        # Samples already present in the pool are reused
+        for category in categories:
+            candidate = os.path.join(pool, category, name)
+            if os.path.exists(candidate):
+                link = (category, candidate)
+                break
+
+        if link is None:
+            category, img = synthesize_sample(i, objects, logo_boxes, backgrounds, seed)
+            if img is None:
+                continue
+            target = os.path.join(pool, category, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            cv2.imwrite(target, img)
+            link = (category, target)
+            created += 1
+
+        category, target = link
+        dst = os.path.join(size_dir, category, name)
+        if not os.path.exists(dst):
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            try:
+                os.link(target, dst)
+            except OSError:
+                os.symlink(os.path.abspath(target), dst)
+
+    logger.info(f"Synthetic dataset of {size} images at {size_dir} ({created} new)")
+    return size_dir